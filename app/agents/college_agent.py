@@ -1,47 +1,61 @@
 import os
-import json
-import httpx
-import google.generativeai as genai
-from app.db import get_supabase
+import asyncio
+from app import college_store
+from app.llm import generate_json
+from app.resilience import DependencyUnavailable
+from app.classify import COURSE_FIELDS, STREAM_FIELDS
+from app.context import ContextBuilder, RECOMMENDATION_FIELDS, project, rank_colleges
+from app.pipeline import Pipeline
 from app.models import Profile
+from app.writes import write_queue
+from app.schemas import COLLEGE_SCHEMA
 from app.agents import recommendation_agent
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, List, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.5-flash")
-
-BASE_URL = "https://raw.githubusercontent.com/Clueless-Community/collegeAPI/main/data"
+COLLEGE_FETCH_CONCURRENCY = 4
+COLLEGE_CONTEXT_TOKENS = int(os.getenv("COLLEGE_CONTEXT_TOKENS", "2000"))
 
 
 async def fetch_colleges(user_id: str, quiz_id: str) -> Dict[str, Any]:
-    supabase = get_supabase()
+    pipeline = build_pipeline(user_id, quiz_id)
+    colleges_data = await pipeline.get("colleges")
 
-    profile_result = (
-        supabase.table("profiles").select("*").eq("user_id", user_id).execute()
-    )
-    if not profile_result.data:
-        raise Exception("profile not found")
+    store_colleges(user_id, colleges_data)
+
+    return colleges_data
 
-    profile = Profile(**profile_result.data[0])
 
-    quiz_result = supabase.table("quizzes").select("*").eq("id", quiz_id).execute()
-    if not quiz_result.data:
-        raise Exception("quiz not found")
+async def stream_colleges(user_id: str, quiz_id: str) -> AsyncIterator[Tuple[str, Any]]:
+    pipeline = build_pipeline(user_id, quiz_id)
 
-    quiz_data = quiz_result.data[0]["quiz_json"]
-    recommendations = await recommendation_agent.fetch_recommendations(user_id, quiz_id)
-    colleges_data = await create_recommendations(profile, quiz_data, recommendations)
+    async for event in pipeline.stream("recommendations", "college_data", "colleges"):
+        yield event
 
-    await store_colleges(user_id, colleges_data)
+    store_colleges(user_id, await pipeline.get("colleges"))
 
-    return colleges_data
+
+def build_pipeline(user_id: str, quiz_id: str) -> Pipeline:
+    pipeline = recommendation_agent.build_pipeline(user_id, quiz_id)
+    pipeline.add("college_data", find_colleges, "profile", "recommendations")
+    pipeline.add(
+        "colleges",
+        create_recommendations,
+        "profile",
+        "quiz",
+        "recommendations",
+        "college_data",
+    )
+    return pipeline
 
 
 async def create_recommendations(
-    profile: Profile, quiz_data: Dict[str, Any], recommendations: Dict[str, Any]
+    profile: Profile,
+    quiz_data: Dict[str, Any],
+    recommendations: Dict[str, Any],
+    matches: Dict[str, Any] | None = None,
 ) -> Dict[str, Any]:
     history = quiz_data.get("history", [])
 
@@ -55,48 +69,10 @@ async def create_recommendations(
             }
         )
 
-    location_state = profile.location.get("state", "")
-    location_city = profile.location.get("city", "")
-
-    if profile.class_level == 9 or profile.class_level == 10:
-        streams = recommendations.get("streams", [])
-        field_mapping = map_streams(streams)
-        print(f"Mapped streams {streams} to fields: {field_mapping}")
-    else:
-        courses = recommendations.get("courses", [])
-        field_mapping = map_courses(courses)
-        print(f"Mapped courses {courses} to fields: {field_mapping}")
-
-    college_data = {}
-    for field in field_mapping:
-        try:
-            colleges_by_state = await fetch_data(field, "state", location_state)
-            colleges_by_city = await fetch_data(field, "city", location_city)
-
-            college_data[field] = {
-                "state_colleges": colleges_by_state[:10],
-                "city_colleges": colleges_by_city[:5],
-                "total_state": len(colleges_by_state),
-                "total_city": len(colleges_by_city),
-                "recommendation_source": streams
-                if profile.class_level in [9, 10]
-                else courses,
-            }
-            print(
-                f"Found {len(colleges_by_state)} colleges in {location_state} for {field}"
-            )
-        except Exception as e:
-            print(f"Error fetching {field} colleges: {e}")
-            college_data[field] = {
-                "state_colleges": [],
-                "city_colleges": [],
-                "total_state": 0,
-                "total_city": 0,
-                "recommendation_source": streams
-                if profile.class_level in [9, 10]
-                else courses,
-            }
+    if matches is None:
+        matches = await find_colleges(profile, recommendations)
 
+    college_data = matches["college_data"]
     intelligent_recommendations = await generate_recommendations(
         profile, quiz_qa, recommendations, college_data
     )
@@ -104,7 +80,7 @@ async def create_recommendations(
     return {
         "college_data": college_data,
         "intelligent_recommendations": intelligent_recommendations,
-        "location": {"state": location_state, "city": location_city},
+        "location": matches["location"],
         "profile_context": {
             "class_level": profile.class_level,
             "stream": getattr(profile, "stream", None),
@@ -119,6 +95,58 @@ async def create_recommendations(
             "reasons": recommendations.get("reasons", {}),
             "message": recommendations.get("message", ""),
         },
+        "field_mapping": matches["field_mapping"],
+        "total_colleges_found": matches["total_colleges_found"],
+    }
+
+
+async def find_colleges(
+    profile: Profile, recommendations: Dict[str, Any]
+) -> Dict[str, Any]:
+    location_state = profile.location.get("state", "")
+    location_city = profile.location.get("city", "")
+
+    if profile.class_level == 9 or profile.class_level == 10:
+        streams = recommendations.get("streams", [])
+        field_mapping = map_streams(streams)
+        print(f"Mapped streams {streams} to fields: {field_mapping}")
+    else:
+        courses = recommendations.get("courses", [])
+        field_mapping = map_courses(courses)
+        print(f"Mapped courses {courses} to fields: {field_mapping}")
+
+    recommendation_source = streams if profile.class_level in [9, 10] else courses
+    semaphore = asyncio.Semaphore(COLLEGE_FETCH_CONCURRENCY)
+    results = await asyncio.gather(
+        *(
+            fetch_field(field, location_state, location_city, semaphore)
+            for field in field_mapping
+        ),
+        return_exceptions=True,
+    )
+
+    college_data = {}
+    for field, result in zip(field_mapping, results):
+        if isinstance(result, Exception):
+            print(f"Error fetching {field} colleges: {result}")
+            colleges_by_state, colleges_by_city = [], []
+        else:
+            colleges_by_state, colleges_by_city = result
+            print(
+                f"Found {len(colleges_by_state)} colleges in {location_state} for {field}"
+            )
+
+        college_data[field] = {
+            "state_colleges": colleges_by_state[:10],
+            "city_colleges": colleges_by_city[:5],
+            "total_state": len(colleges_by_state),
+            "total_city": len(colleges_by_city),
+            "recommendation_source": recommendation_source,
+        }
+
+    return {
+        "college_data": college_data,
+        "location": {"state": location_state, "city": location_city},
         "field_mapping": field_mapping,
         "total_colleges_found": sum(
             data.get("total_state", 0) + data.get("total_city", 0)
@@ -130,176 +158,22 @@ async def create_recommendations(
 async def fetch_data(
     field: str, filter_type: str, location: str
 ) -> List[Dict[str, Any]]:
-    if not location:
-        return []
+    return await college_store.find_colleges(field, filter_type, location)
 
-    file_mapping = {
-        "engineering": "engineering_ranking.json",
-        "medical": "medical_ranking.json",
-        "management": "management_ranking.json",
-        "agriculture": "allAgriculture.json",
-        "dental": "dental_ranking.json",
-        "law": "law_ranking.json",
-        "pharmacy": "pharmacy_ranking.json",
-        "architecture": "architecture_ranking.json",
-    }
 
-    filename = file_mapping.get(field)
-    if not filename:
-        return []
-
-    url = f"{BASE_URL}/{filename}"
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            colleges = response.json()
-
-        filtered_colleges = []
-        location_lower = location.lower()
-
-        for college in colleges:
-            if field == "agriculture":
-                college_state = college.get("State", "").lower()
-                college_city = college.get("City", "").lower()
-            else:
-                college_state = college.get("state", "").lower()
-                college_city = college.get("city", "").lower()
-
-            if filter_type == "state" and college_state == location_lower:
-                filtered_colleges.append(college)
-            elif filter_type == "city" and college_city == location_lower:
-                filtered_colleges.append(college)
-
-        return filtered_colleges
-
-    except httpx.RequestError:
-        return []
-    except httpx.HTTPStatusError:
-        return []
-    except json.JSONDecodeError:
-        return []
+async def fetch_field(
+    field: str, state: str, city: str, semaphore: asyncio.Semaphore
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    async with semaphore:
+        return await college_store.find_by_location(field, state, city)
 
 
 def map_streams(streams: List[str]) -> List[str]:
-    stream_mapping = {
-        "Science (PCM)": ["engineering"],
-        "Science (PCB)": ["medical"],
-        "Science with Computer Science": ["engineering"],
-        "Commerce with Mathematics": ["management"],
-        "Commerce with Business Studies": ["management"],
-        "Commerce": ["management"],
-        "Arts with Fine Arts": ["architecture"],
-        "Arts with Languages/Mass Comm": ["law"],
-        "Arts/Humanities": ["law"],
-        "Vocational/Skill-based courses": ["engineering", "medical", "management"],
-    }
-
-    mapped_fields = []
-    for stream in streams:
-        if stream in stream_mapping:
-            mapped_fields.extend(stream_mapping[stream])
-        else:
-            if "science" in stream.lower():
-                if "pcm" in stream.lower() or "physics" in stream.lower():
-                    mapped_fields.append("engineering")
-                elif "pcb" in stream.lower() or "biology" in stream.lower():
-                    mapped_fields.append("medical")
-                else:
-                    mapped_fields.extend(["engineering", "medical"])
-            elif "commerce" in stream.lower():
-                mapped_fields.append("management")
-            elif "arts" in stream.lower() or "humanities" in stream.lower():
-                mapped_fields.append("law")
-
-    return (
-        list(set(mapped_fields))
-        if mapped_fields
-        else ["engineering", "medical", "management"]
-    )
+    return STREAM_FIELDS.labels(streams)
 
 
 def map_courses(courses: List[str]) -> List[str]:
-    course_mapping = {
-        "B.Tech": ["engineering"],
-        "B.Tech CSE": ["engineering"],
-        "MBBS": ["medical"],
-        "B.Pharmacy": ["pharmacy"],
-        "B.Sc Nursing": ["medical"],
-        "B.Com": ["management"],
-        "BBA": ["management"],
-        "CA Foundation": ["management"],
-        "Banking & Insurance": ["management"],
-        "BA": ["law"],
-        "B.Ed": ["law"],
-        "Law": ["law"],
-        "B.Arch": ["architecture"],
-        "BA Fine Arts": ["architecture"],
-        "Design": ["architecture"],
-        "Mass Communication": ["law"],
-        "Journalism": ["law"],
-        "Diploma": ["engineering"],
-        "ITI": ["engineering"],
-        "Paramedical": ["medical"],
-        "Hospitality": ["management"],
-        "Hotel Management": ["management"],
-    }
-
-    mapped_fields = []
-    for course in courses:
-        course_found = False
-        for key in course_mapping:
-            if key.lower() in course.lower():
-                mapped_fields.extend(course_mapping[key])
-                course_found = True
-                break
-
-        if not course_found:
-            if any(
-                word in course.lower()
-                for word in [
-                    "tech",
-                    "engineer",
-                    "computer",
-                    "mechanical",
-                    "civil",
-                    "electrical",
-                ]
-            ):
-                mapped_fields.append("engineering")
-            elif any(
-                word in course.lower()
-                for word in ["medical", "mbbs", "doctor", "nurse", "pharmacy", "dental"]
-            ):
-                mapped_fields.append("medical")
-            elif any(
-                word in course.lower()
-                for word in [
-                    "commerce",
-                    "management",
-                    "business",
-                    "finance",
-                    "economics",
-                ]
-            ):
-                mapped_fields.append("management")
-            elif any(
-                word in course.lower()
-                for word in ["architecture", "design", "fine arts"]
-            ):
-                mapped_fields.append("architecture")
-            elif any(
-                word in course.lower()
-                for word in ["law", "legal", "arts", "humanities", "social"]
-            ):
-                mapped_fields.append("law")
-
-    return (
-        list(set(mapped_fields))
-        if mapped_fields
-        else ["engineering", "medical", "management"]
-    )
+    return COURSE_FIELDS.labels(courses)
 
 
 async def generate_recommendations(
@@ -308,6 +182,21 @@ async def generate_recommendations(
     recommendations: Dict[str, Any],
     college_data: Dict[str, Any],
 ) -> Dict[str, Any]:
+    context = ContextBuilder(COLLEGE_CONTEXT_TOKENS)
+    context.add(
+        "QUIZ RESPONSES & PERSONALITY",
+        [{"question": qa["question"], "answer": qa["answer"]} for qa in quiz_qa],
+    )
+    context.add(
+        "CAREER GUIDANCE RESULTS", project(recommendations, RECOMMENDATION_FIELDS)
+    )
+    context.add_items(
+        "AVAILABLE COLLEGES (best matches first)", rank_colleges(college_data)
+    )
+    print(
+        f"College prompt context: {context.tokens} tokens, {context.dropped} colleges dropped"
+    )
+
     prompt = f"""You are an expert college counselor for Indian students. Based on the student's comprehensive profile, quiz responses, career recommendations, and available colleges, provide intelligent and personalized college recommendations.
 
 STUDENT PROFILE:
@@ -320,14 +209,7 @@ STUDENT PROFILE:
 - Language Preference: {profile.language_preference}
 - Stream: {getattr(profile, "stream", "Not specified")}
 
-QUIZ RESPONSES & PERSONALITY:
-{json.dumps(quiz_qa, indent=2)}
-
-CAREER GUIDANCE RESULTS:
-{json.dumps(recommendations, indent=2)}
-
-AVAILABLE COLLEGES BY FIELD:
-{json.dumps(college_data, indent=2)}
+{context.build()}
 
 INSTRUCTIONS:
 1. Prioritize colleges that match the student's recommended streams/courses from career guidance
@@ -367,19 +249,10 @@ Provide specific, actionable recommendations based strictly on their profile and
 }}
 """
 
-    response = model.generate_content(prompt)
-
     try:
-        response_text = response.text.strip()
-
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].strip()
-
-        intelligent_recs = json.loads(response_text)
+        intelligent_recs = await generate_json(prompt, "college", schema=COLLEGE_SCHEMA)
         return intelligent_recs
-    except (json.JSONDecodeError, KeyError):
+    except (ValueError, KeyError, DependencyUnavailable):
         return {
             "top_colleges": [],
             "budget_strategy": f"Plan for {profile.budget_range} budget considering your {profile.reservation_category} category benefits",
@@ -406,26 +279,12 @@ async def search_colleges(
         return []
 
 
-async def store_colleges(user_id: str, colleges_data: Dict[str, Any]) -> None:
-    supabase = get_supabase()
-
-    try:
-        college_record = {
-            "user_id": user_id,
-            "colleges_json": colleges_data,
-            "source": "college_api",
-            "updated_at": "now()",
-        }
-
-        existing = (
-            supabase.table("colleges").select("*").eq("user_id", user_id).execute()
-        )
+def store_colleges(user_id: str, colleges_data: Dict[str, Any]) -> None:
+    college_record = {
+        "user_id": user_id,
+        "colleges_json": colleges_data,
+        "source": "college_api",
+        "updated_at": "now()",
+    }
 
-        if existing.data:
-            supabase.table("colleges").update(college_record).eq(
-                "user_id", user_id
-            ).execute()
-        else:
-            supabase.table("colleges").insert(college_record).execute()
-    except Exception:
-        pass
+    write_queue.put("colleges", college_record, "user_id")
@@ -1,5 +1,6 @@
-from app.db import get_supabase
+from app.db import execute, get_supabase
 from app.models import ProfileCreate, Profile
+from app.agents import recommendation_agent
 from typing import Optional
 
 
@@ -9,7 +10,7 @@ async def create_profile(profile_data: ProfileCreate, user_id: str) -> Profile:
     profile_dict = profile_data.model_dump()
     profile_dict["user_id"] = user_id
 
-    result = supabase.table("profiles").insert(profile_dict).execute()
+    result = await execute(supabase.table("profiles").insert(profile_dict))
 
     if result.data:
         return Profile(**result.data[0])
@@ -19,7 +20,9 @@ async def create_profile(profile_data: ProfileCreate, user_id: str) -> Profile:
 
 async def get_profile(user_id: str) -> Optional[Profile]:
     supabase = get_supabase()
-    result = supabase.table("profiles").select("*").eq("user_id", user_id).execute()
+    result = await execute(
+        supabase.table("profiles").select("*").eq("user_id", user_id), read=True
+    )
 
     if result.data:
         return Profile(**result.data[0])
@@ -30,9 +33,10 @@ async def update_profile(user_id: str, profile_data: ProfileCreate) -> Profile:
     supabase = get_supabase()
     profile_dict = profile_data.model_dump()
 
-    result = (
-        supabase.table("profiles").update(profile_dict).eq("user_id", user_id).execute()
+    result = await execute(
+        supabase.table("profiles").update(profile_dict).eq("user_id", user_id)
     )
+    await recommendation_agent.invalidate_cache(user_id)
 
     if result.data:
         return Profile(**result.data[0])
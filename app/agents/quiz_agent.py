@@ -1,36 +1,103 @@
 import os
 import json
 import uuid
-import google.generativeai as genai
-from app.db import get_supabase
-from app.models import Profile, Quiz, QuizCreate
+import time
+import asyncio
+import textwrap
+from app.db import execute, get_supabase
+from postgrest import ReturnMethod
+from app.llm import generate_json, estimate_tokens
+from app.models import Profile, Quiz, QuizCreate, QuizResponseCreate
+from app.schemas import QUESTION_SCHEMA
+from app.agents import recommendation_agent
 from app.agents.profile_agent import get_profile
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 
 load_dotenv()
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.5-flash")
+QUIZ_PREFETCH = os.getenv("QUIZ_PREFETCH", "false").lower() == "true"
+QUIZ_PREFETCH_CONCURRENCY = int(os.getenv("QUIZ_PREFETCH_CONCURRENCY", "8"))
+QUIZ_PREFETCH_MAX_PENDING = int(os.getenv("QUIZ_PREFETCH_MAX_PENDING", "64"))
+# seconds a submit waits on an unfinished branch before asking Gemini directly
+QUIZ_PREFETCH_GRACE = float(os.getenv("QUIZ_PREFETCH_GRACE", "0.1"))
+QUIZ_PREFETCH_MAX_QUIZZES = 1000
+QUIZ_HISTORY_TURNS = int(os.getenv("QUIZ_HISTORY_TURNS", "4"))
+QUIZ_HISTORY_TOKENS = int(os.getenv("QUIZ_HISTORY_TOKENS", "600"))
+QUIZ_SUMMARY_CHARS = 60
+QUIZ_FLUSH_INTERVAL = float(os.getenv("QUIZ_FLUSH_INTERVAL", "2"))
+QUIZ_SESSION_IDLE = float(os.getenv("QUIZ_SESSION_IDLE", "1800"))
 
+QUIZ_PROMPT_PREFIX = """You are a career guidance expert for Indian students. Generate exactly ONE personalized question in JSON format.
 
-async def generate_question(user_id: str) -> Dict[str, Any]:
+Requirements:
+- Generate a single question that is VERY SPECIFIC and PERSONALIZED based on the student's profile and previous answers
+- Make it like Akinator - each question should narrow down interests/aptitudes significantly
+- Use the language given under Language
+- Return ONLY valid JSON in this exact format, using the given question id and language:
+
+{
+  "id": "<question id>",
+  "type": "mcq",
+  "text": "your personalized question here",
+  "options": ["option1", "option2", "option3", "option4"],
+  "language": "<language>"
+}
+
+The question should be:
+- Highly specific to their profile (class, location, budget, etc.)
+- Different from generic career questions
+- Focused on discovering unique interests/skills
+- Progressive based on previous answers
+"""
+
+sessions: Dict[str, "QuizSession"] = {}
+prefetches: Dict[str, Dict[str, asyncio.Task]] = {}
+prefetch_semaphore = asyncio.Semaphore(QUIZ_PREFETCH_CONCURRENCY)
+
+
+class QuizSession:
+    def __init__(
+        self,
+        quiz_id: str,
+        user_id: str,
+        profile: Profile,
+        quiz_data: Dict[str, Any],
+        history: List[Dict],
+    ) -> None:
+        self.quiz_id = quiz_id
+        self.user_id = user_id
+        self.profile = profile
+        self.quiz_data = quiz_data
+        self.history = history
+        self.responses: List[QuizResponseCreate] = []
+        self.dirty = False
+        self.touched = time.monotonic()
+        self.lock = asyncio.Lock()
+        # serializes flushes; separate from lock because submit_answer
+        # flushes while holding it
+        self.flush_lock = asyncio.Lock()
+
+
+async def generate_question(user_id: str, max_questions: int = 10) -> Dict[str, Any]:
     profile = await get_profile(user_id)
     if not profile:
         raise Exception("profile not found")
 
     quiz_id = str(uuid.uuid4())
     question = await call_gemini(profile, [])
-    quiz_data = {"history": [], "current_question": question, "question_count": 1}
+    quiz_data = {"current_question": question, "question_count": 1}
     quiz_create = QuizCreate(user_id=user_id, quiz_json=quiz_data, source="gemini")
 
     await save_quiz(quiz_id, quiz_create)
+    sessions[quiz_id] = QuizSession(quiz_id, user_id, profile, quiz_data, [])
+    schedule_prefetch(quiz_id, profile, [], question, 1, max_questions)
 
     return {
         "quiz_id": quiz_id,
         "question": question,
         "question_number": 1,
-        "total_questions": 10,
+        "total_questions": max_questions,
         "class_level": profile.class_level,
     }
 
@@ -38,40 +105,72 @@ async def generate_question(user_id: str) -> Dict[str, Any]:
 async def submit_answer(
     quiz_id: str, answer: str, max_questions: int = 10
 ) -> Dict[str, Any]:
-    quiz = await get_quiz(quiz_id)
-    if not quiz:
-        raise Exception("quiz not found")
-
-    quiz_data = quiz.quiz_json
-    current_question = quiz_data["current_question"]
-    history = quiz_data.get("history", [])
-    question_count = quiz_data.get("question_count", 1)
-
-    history.append(
-        {
-            "question": current_question,
-            "answer": answer,
-            "question_number": question_count,
-        }
-    )
-
-    if question_count >= max_questions:
-        await update_history(quiz_id, history)
-        return {
-            "done": True,
-            "total_questions": max_questions,
-            "question_count": question_count,
+    session = await get_session(quiz_id)
+
+    async with session.lock:
+        session.touched = time.monotonic()
+        quiz_data = session.quiz_data
+        if quiz_data.get("completed"):
+            return {
+                "done": True,
+                "total_questions": max_questions,
+                "question_count": quiz_data.get("question_count", max_questions),
+            }
+
+        current_question = quiz_data["current_question"]
+        question_count = quiz_data.get("question_count", 1)
+        response = QuizResponseCreate(
+            user_id=session.user_id,
+            quiz_id=quiz_id,
+            question_number=question_count,
+            answers={"question": current_question, "answer": answer},
+        )
+        history = session.history + [
+            {
+                "question": current_question,
+                "answer": answer,
+                "question_number": question_count,
+            }
+        ]
+
+        if question_count >= max_questions:
+            cancel_prefetch(quiz_id)
+            previous = session.history, session.quiz_data
+            session.history = history
+            session.responses.append(response)
+            session.quiz_data = {"question_count": question_count, "completed": True}
+            session.dirty = True
+            try:
+                await flush_session(session)
+            except Exception:
+                # leave the last question open so the submit can be retried
+                session.history, session.quiz_data = previous
+                session.responses.remove(response)
+                raise
+            sessions.pop(quiz_id, None)
+            await recommendation_agent.invalidate_cache(session.user_id)
+            return {
+                "done": True,
+                "total_questions": max_questions,
+                "question_count": question_count,
+            }
+
+        profile = session.profile
+        next_question = await take_prefetched(quiz_id, answer)
+        if next_question is None:
+            next_question = await call_gemini(profile, history)
+
+        session.history = history
+        session.responses.append(response)
+        session.quiz_data = {
+            "current_question": next_question,
+            "question_count": question_count + 1,
         }
+        session.dirty = True
 
-    profile = await get_profile(quiz.user_id)
-    next_question = await call_gemini(profile, history)
-    new_quiz_data = {
-        "history": history,
-        "current_question": next_question,
-        "question_count": question_count + 1,
-    }
-
-    await update_data(quiz_id, new_quiz_data)
+    schedule_prefetch(
+        quiz_id, profile, history, next_question, question_count + 1, max_questions
+    )
 
     return {
         "done": False,
@@ -82,24 +181,182 @@ async def submit_answer(
     }
 
 
-async def call_gemini(profile: Profile, history: List[Dict]) -> Dict[str, Any]:
-    prompt = build_prompt(profile, history)
-    response = model.generate_content(prompt)
+async def get_session(quiz_id: str) -> QuizSession:
+    session = sessions.get(quiz_id)
+    if session is not None:
+        return session
 
+    quiz, history = await asyncio.gather(get_quiz(quiz_id), get_history(quiz_id))
+    if not quiz:
+        raise Exception("quiz not found")
+
+    profile = await get_profile(quiz.user_id)
+    if not profile:
+        raise Exception("profile not found")
+
+    # quizzes started before answers moved to quiz_responses keep their
+    # history inside quiz_json; queue it as rows so the first flush backfills
+    # quiz_responses before quiz_json is rewritten without it
+    legacy = quiz.quiz_json.pop("history", [])
+    backfill = []
+    if not history and legacy:
+        history = legacy
+        backfill = [
+            QuizResponseCreate(
+                user_id=quiz.user_id,
+                quiz_id=quiz_id,
+                question_number=item.get("question_number", number),
+                answers={"question": item["question"], "answer": item["answer"]},
+            )
+            for number, item in enumerate(legacy, 1)
+        ]
+
+    session = QuizSession(quiz_id, quiz.user_id, profile, quiz.quiz_json, history)
+    session.responses = backfill
+    session.dirty = bool(backfill)
+
+    # another request may have loaded the same quiz while this one waited
+    return sessions.setdefault(quiz_id, session)
+
+
+async def flush_session(session: QuizSession) -> None:
+    async with session.flush_lock:
+        if not session.dirty:
+            return
+
+        # snapshot answers and pointer together: a submit landing while the
+        # answers are written must not get its pointer in ahead of its answer
+        session.dirty = False
+        responses, session.responses = session.responses, []
+        quiz_data = session.quiz_data
+        try:
+            # answers go in before the pointer to the next question so a crash
+            # between the two writes never loses an answered question
+            if responses:
+                await save_responses(responses)
+            await update_data(session.quiz_id, quiz_data)
+        except Exception:
+            session.responses = responses + session.responses
+            session.dirty = True
+            raise
+
+
+async def flush_sessions() -> None:
+    for session in list(sessions.values()):
+        try:
+            await flush_session(session)
+        except Exception as e:
+            print(f"Error flushing quiz {session.quiz_id}: {e}")
+
+    idle_cutoff = time.monotonic() - QUIZ_SESSION_IDLE
+    for quiz_id, session in list(sessions.items()):
+        if not session.dirty and session.touched < idle_cutoff:
+            sessions.pop(quiz_id, None)
+
+
+async def run_session_flusher() -> None:
     try:
-        response_text = response.text.strip()
+        while True:
+            await asyncio.sleep(QUIZ_FLUSH_INTERVAL)
+            await flush_sessions()
+    finally:
+        await flush_sessions()
 
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].strip()
 
-        question_json = json.loads(response_text)
-        return validate_question(question_json)
-    except (json.JSONDecodeError, KeyError):
+async def call_gemini(
+    profile: Profile, history: List[Dict], priority: str | None = None
+) -> Dict[str, Any]:
+    prompt = build_prompt(profile, history)
+    try:
+        return await generate_json(
+            prompt,
+            "quiz",
+            schema=QUESTION_SCHEMA,
+            validate=validate_question,
+            priority=priority,
+        )
+    except (ValueError, KeyError):
         raise Exception("invalid gemini response")
 
 
+def schedule_prefetch(
+    quiz_id: str,
+    profile: Profile,
+    history: List[Dict],
+    question: Dict[str, Any],
+    question_count: int,
+    max_questions: int,
+) -> None:
+    cancel_prefetch(quiz_id)
+    if not QUIZ_PREFETCH or question_count >= max_questions:
+        return
+
+    while len(prefetches) >= QUIZ_PREFETCH_MAX_QUIZZES:
+        cancel_prefetch(next(iter(prefetches)))
+
+    pending = sum(
+        not task.done()
+        for branches in prefetches.values()
+        for task in branches.values()
+    )
+    branches = {}
+    for option in question["options"]:
+        if pending >= QUIZ_PREFETCH_MAX_PENDING:
+            break
+
+        branch_history = history + [
+            {"question": question, "answer": option, "question_number": question_count}
+        ]
+        task = asyncio.create_task(prefetch_question(profile, branch_history))
+        task.add_done_callback(finish_prefetch)
+        branches[normalize_answer(option)] = task
+        pending += 1
+
+    if branches:
+        prefetches[quiz_id] = branches
+
+
+async def prefetch_question(profile: Profile, history: List[Dict]) -> Dict[str, Any]:
+    async with prefetch_semaphore:
+        return await call_gemini(profile, history, priority="prefetch")
+
+
+async def take_prefetched(quiz_id: str, answer: str) -> Dict[str, Any] | None:
+    branches = prefetches.pop(quiz_id, {})
+    task = branches.pop(normalize_answer(answer), None)
+    for other in branches.values():
+        other.cancel()
+
+    if task is None:
+        return None
+
+    # a branch still queued behind the prefetch semaphore or at the lowest
+    # scheduler class is slower than a direct call at quiz priority
+    await asyncio.wait({task}, timeout=QUIZ_PREFETCH_GRACE)
+    if not task.done():
+        task.cancel()
+        return None
+    if task.cancelled() or task.exception() is not None:
+        return None
+    return task.result()
+
+
+def finish_prefetch(task: asyncio.Task) -> None:
+    # retrieve the error so a dropped branch is not reported as an unhandled
+    # task exception
+    if not task.cancelled():
+        task.exception()
+
+
+def cancel_prefetch(quiz_id: str) -> None:
+    for task in prefetches.pop(quiz_id, {}).values():
+        task.cancel()
+
+
+def normalize_answer(answer: str) -> str:
+    return " ".join(answer.split()).lower()
+
+
 def build_prompt(profile: Profile, history: List[Dict]) -> str:
     context = {
         "class_level": profile.class_level,
@@ -112,44 +369,49 @@ def build_prompt(profile: Profile, history: List[Dict]) -> str:
         "location": profile.location,
     }
 
-    if history:
-        previous_qa = "\\n".join(
-            [
-                f"Q{item['question_number']}: {item['question']['text']} - Answer: {item['answer']}"
-                for item in history
-            ]
-        )
-        context_text = f"Previous Q&A: {previous_qa}"
-    else:
-        context_text = "This is the first question"
-
-    language = profile.language_preference
-    prompt = f"""You are a career guidance expert for Indian students. Generate exactly ONE personalized question in JSON format.
-
+    # the instructions come first and never change, so Gemini can reuse the
+    # cached prefix; everything student-specific follows it
+    return f"""{QUIZ_PROMPT_PREFIX}
 Student Context: {json.dumps(context)}
-{context_text}
-
-Requirements:
-- Generate a single question that is VERY SPECIFIC and PERSONALIZED based on the student's profile and previous answers
-- Make it like Akinator - each question should narrow down interests/aptitudes significantly
-- Use {language} language
-- Return ONLY valid JSON in this exact format:
-
-{{
-  "id": "q{len(history) + 1}",
-  "type": "mcq",
-  "text": "your personalized question here",
-  "options": ["option1", "option2", "option3", "option4"],
-  "language": "{language}"
-}}
-
-The question should be:
-- Highly specific to their profile (class, location, budget, etc.)
-- Different from generic career questions
-- Focused on discovering unique interests/skills
-- Progressive based on previous answers"""
-
-    return prompt
+Question id: q{len(history) + 1}
+Language: {profile.language_preference}
+{compact_history(history)}"""
+
+
+def compact_history(history: List[Dict]) -> str:
+    if not history:
+        return "This is the first question"
+
+    recent = history[-QUIZ_HISTORY_TURNS:] if QUIZ_HISTORY_TURNS > 0 else []
+    older = history[: len(history) - len(recent)]
+
+    recent_lines = [
+        f"Q{item['question_number']}: {item['question']['text']} - Answer: {item['answer']}"
+        for item in recent
+    ]
+    budget = QUIZ_HISTORY_TOKENS - estimate_tokens("\n".join(recent_lines))
+
+    summary_lines = []
+    for item in reversed(older):
+        question = textwrap.shorten(item["question"]["text"], QUIZ_SUMMARY_CHARS)
+        line = f"Q{item['question_number']}: {question} -> {item['answer']}"
+        cost = estimate_tokens(line)
+        if cost > budget:
+            break
+        summary_lines.insert(0, line)
+        budget -= cost
+
+    sections = []
+    omitted = len(older) - len(summary_lines)
+    if older:
+        header = "Earlier answers (summarized)"
+        if omitted:
+            header += f", {omitted} oldest omitted"
+        sections.append("\n".join([f"{header}:"] + summary_lines))
+    if recent_lines:
+        sections.append("\n".join(["Recent Q&A:"] + recent_lines))
+
+    return "\n".join(sections)
 
 
 def validate_question(question_json: Dict) -> Dict[str, Any]:
@@ -172,28 +434,57 @@ async def save_quiz(quiz_id: str, quiz_create: QuizCreate):
     quiz_dict = quiz_create.model_dump()
     quiz_dict["id"] = quiz_id
 
-    supabase.table("quizzes").insert(quiz_dict).execute()
+    await execute(supabase.table("quizzes").insert(quiz_dict))
 
 
 async def get_quiz(quiz_id: str) -> Quiz:
     supabase = get_supabase()
-    result = supabase.table("quizzes").select("*").eq("id", quiz_id).execute()
+    result = await execute(
+        supabase.table("quizzes").select("*").eq("id", quiz_id), read=True
+    )
 
     if result.data:
         return Quiz(**result.data[0])
     return None
 
 
-async def update_data(quiz_id: str, quiz_data: Dict[str, Any]):
+async def save_responses(responses: List[QuizResponseCreate]):
     supabase = get_supabase()
-    supabase.table("quizzes").update({"quiz_json": quiz_data}).eq(
-        "id", quiz_id
-    ).execute()
+    rows = [response.model_dump() for response in responses]
+
+    # a retried flush may resend rows that already landed
+    await execute(
+        supabase.table("quiz_responses").upsert(
+            rows,
+            on_conflict="quiz_id,question_number",
+            ignore_duplicates=True,
+            returning=ReturnMethod.minimal,
+        )
+    )
+
+
+async def get_history(quiz_id: str) -> List[Dict]:
+    supabase = get_supabase()
+    result = await execute(
+        supabase.table("quiz_responses")
+        .select("question_number, answers")
+        .eq("quiz_id", quiz_id)
+        .order("question_number"),
+        read=True,
+    )
+
+    return [
+        {
+            "question": row["answers"]["question"],
+            "answer": row["answers"]["answer"],
+            "question_number": row["question_number"],
+        }
+        for row in result.data
+    ]
 
 
-async def update_history(quiz_id: str, history: List[Dict]):
+async def update_data(quiz_id: str, quiz_data: Dict[str, Any]):
     supabase = get_supabase()
-    quiz_data = {"history": history, "completed": True}
-    supabase.table("quizzes").update({"quiz_json": quiz_data}).eq(
-        "id", quiz_id
-    ).execute()
+    await execute(
+        supabase.table("quizzes").update({"quiz_json": quiz_data}).eq("id", quiz_id)
+    )
@@ -1,38 +1,243 @@
 import os
 import json
-import google.generativeai as genai
-from app.db import get_supabase
+import asyncio
+import hashlib
+from app import recommender
+from app.cache import LRUCache
+from app.classify import CAREER_PATHS, COURSE_EXAMS, SCHOLARSHIP_COURSES
+from app.db import execute, get_supabase
+from app.llm import generate_json
+from app.pipeline import Pipeline
 from app.models import Profile
-from typing import Dict, Any, List
+from app.writes import write_queue
+from app.schemas import CAREERS_SCHEMA, STREAMS_SCHEMA
+from typing import Dict, Any, AsyncIterator, List, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.5-flash")
+RECOMMENDATION_CACHE_SIZE = 512
+# seconds to wait on Gemini before answering from the local model
+RECOMMEND_LLM_BUDGET = float(os.getenv("RECOMMEND_LLM_BUDGET", "8"))
+# answer from the local model straight away and let Gemini refine the cache
+RECOMMEND_LOCAL_FIRST = os.getenv("RECOMMEND_LOCAL_FIRST", "false").lower() == "true"
+
+FINGERPRINT_FIELDS = {
+    "class_level",
+    "stream",
+    "age",
+    "language_preference",
+    "budget_range",
+    "reservation_category",
+    "mobility",
+    "location",
+}
+
+recommendation_cache = LRUCache(RECOMMENDATION_CACHE_SIZE)
+# Gemini calls still running per cache key, shared by concurrent requests
+refinements: Dict[Tuple[str, str], asyncio.Task] = {}
 
 
 async def fetch_recommendations(user_id: str, quiz_id: str) -> Dict[str, Any]:
+    pipeline = build_pipeline(user_id, quiz_id)
+    return await pipeline.get("recommendations")
+
+
+async def stream_recommendations(
+    user_id: str, quiz_id: str
+) -> AsyncIterator[Tuple[str, Any]]:
+    # serve the local model's answer at once, then Gemini's refinement as a
+    # second event when it lands
+    profile, quiz_data = await asyncio.gather(load_profile(user_id), load_quiz(quiz_id))
+    key = (profile.user_id, fingerprint(profile, quiz_data))
+
+    cached = await get_cached(key)
+    if cached is not None:
+        yield "recommendations", cached
+        return
+
+    task = start_refinement(key, profile, quiz_data)
+    yield "recommendations", create_local(profile, quiz_data)
+
+    try:
+        refined = await asyncio.shield(task)
+    except Exception as e:
+        print(f"Gemini recommendations failed, keeping local model answer: {e}")
+        return
+    yield "recommendations_refined", refined
+
+
+def build_pipeline(user_id: str, quiz_id: str) -> Pipeline:
+    pipeline = Pipeline()
+    pipeline.add("profile", lambda: load_profile(user_id))
+    pipeline.add("quiz", lambda: load_quiz(quiz_id))
+    pipeline.add("recommendations", create_recommendations, "profile", "quiz")
+    return pipeline
+
+
+async def load_profile(user_id: str) -> Profile:
     supabase = get_supabase()
 
-    profile_result = (
-        supabase.table("profiles").select("*").eq("user_id", user_id).execute()
+    profile_result = await execute(
+        supabase.table("profiles").select("*").eq("user_id", user_id), read=True
     )
     if not profile_result.data:
         raise Exception("profile not found")
 
-    profile = Profile(**profile_result.data[0])
+    return Profile(**profile_result.data[0])
+
+
+async def load_quiz(quiz_id: str) -> Dict[str, Any]:
+    supabase = get_supabase()
 
-    quiz_result = supabase.table("quizzes").select("*").eq("id", quiz_id).execute()
+    quiz_result, responses_result = await asyncio.gather(
+        execute(supabase.table("quizzes").select("*").eq("id", quiz_id), read=True),
+        execute(
+            supabase.table("quiz_responses")
+            .select("question_number, answers")
+            .eq("quiz_id", quiz_id)
+            .order("question_number"),
+            read=True,
+        ),
+    )
     if not quiz_result.data:
         raise Exception("quiz not found")
 
     quiz_data = quiz_result.data[0]["quiz_json"]
+    if responses_result.data:
+        quiz_data["history"] = [
+            {
+                "question": row["answers"]["question"],
+                "answer": row["answers"]["answer"],
+                "question_number": row["question_number"],
+            }
+            for row in responses_result.data
+        ]
+
+    return quiz_data
+
+
+async def create_recommendations(
+    profile: Profile, quiz_data: Dict[str, Any]
+) -> Dict[str, Any]:
+    key = (profile.user_id, fingerprint(profile, quiz_data))
+
+    cached = await get_cached(key)
+    if cached is not None:
+        return cached
 
+    task = start_refinement(key, profile, quiz_data)
+    if not RECOMMEND_LOCAL_FIRST:
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), RECOMMEND_LLM_BUDGET)
+        except asyncio.TimeoutError:
+            print(
+                f"Gemini recommendations over {RECOMMEND_LLM_BUDGET}s, "
+                "answering from local model"
+            )
+        except Exception as e:
+            print(f"Gemini recommendations failed, answering from local model: {e}")
+
+    return create_local(profile, quiz_data)
+
+
+def start_refinement(
+    key: Tuple[str, str], profile: Profile, quiz_data: Dict[str, Any]
+) -> asyncio.Task:
+    task = refinements.get(key)
+    if task is None:
+        task = asyncio.create_task(refine(key, profile, quiz_data))
+        refinements[key] = task
+        task.add_done_callback(lambda done: finish_refinement(key, done))
+    return task
+
+
+async def refine(
+    key: Tuple[str, str], profile: Profile, quiz_data: Dict[str, Any]
+) -> Dict[str, Any]:
     if profile.class_level == 9 or profile.class_level == 10:
-        return await create_streams(profile, quiz_data)
+        recommendations = await create_streams(profile, quiz_data)
     else:
-        return await create_careers(profile, quiz_data)
+        recommendations = await create_careers(profile, quiz_data)
+
+    store_cached(key, recommendations)
+    return recommendations
+
+
+def finish_refinement(key: Tuple[str, str], task: asyncio.Task) -> None:
+    if refinements.get(key) is task:
+        del refinements[key]
+    # retrieve the error so a refinement nobody waited for is not reported
+    # as an unhandled task exception
+    if not task.cancelled():
+        task.exception()
+
+
+def fingerprint(profile: Profile, quiz_data: Dict[str, Any]) -> str:
+    payload = {
+        "profile": profile.model_dump(include=FINGERPRINT_FIELDS),
+        "history": [
+            {
+                "question": qa["question"]["text"],
+                "answer": qa["answer"],
+                "question_number": qa.get("question_number", 0),
+            }
+            for qa in quiz_data.get("history", [])
+        ],
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+async def get_cached(key: Tuple[str, str]) -> Dict[str, Any] | None:
+    cached = recommendation_cache.get(key)
+    if cached is not None:
+        return cached
+
+    user_id, digest = key
+    supabase = get_supabase()
+
+    try:
+        result = await execute(
+            supabase.table("recommendations")
+            .select("recommendations_json")
+            .eq("user_id", user_id)
+            .eq("fingerprint", digest),
+            read=True,
+        )
+    except Exception:
+        return None
+
+    if not result.data:
+        return None
+
+    cached = result.data[0]["recommendations_json"]
+    recommendation_cache.set(key, cached)
+    return cached
+
+
+def store_cached(key: Tuple[str, str], recommendations: Dict[str, Any]) -> None:
+    recommendation_cache.set(key, recommendations)
+
+    user_id, digest = key
+    record = {
+        "user_id": user_id,
+        "fingerprint": digest,
+        "recommendations_json": recommendations,
+    }
+    write_queue.put("recommendations", record, "user_id,fingerprint")
+
+
+async def invalidate_cache(user_id: str) -> None:
+    recommendation_cache.discard(lambda key: key[0] == user_id)
+    write_queue.discard("recommendations", "user_id,fingerprint", user_id)
+
+    supabase = get_supabase()
+
+    try:
+        await execute(supabase.table("recommendations").delete().eq("user_id", user_id))
+    except Exception:
+        pass
 
 
 async def create_streams(profile: Profile, quiz_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -77,17 +282,10 @@ Return the response as a valid JSON object with the following structure:
 }}
 """
 
-    response = model.generate_content(prompt)
-
     try:
-        response_text = response.text.strip()
-
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].strip()
-
-        recommendations = json.loads(response_text)
+        recommendations = await generate_json(
+            prompt, "recommendation", schema=STREAMS_SCHEMA
+        )
 
         streams = recommendations.get("streams", [])
         reasons = recommendations.get("reasons", {})
@@ -109,7 +307,7 @@ Return the response as a valid JSON object with the following structure:
             "detailed_paths": detailed_paths,
             "message": message,
         }
-    except (json.JSONDecodeError, KeyError):
+    except (ValueError, KeyError):
         raise Exception("invalid gemini response")
 
 
@@ -161,17 +359,10 @@ Return the response as a valid JSON object with the following structure:
 }}
 """
 
-    response = model.generate_content(prompt)
-
     try:
-        response_text = response.text.strip()
-
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].strip()
-
-        recommendations = json.loads(response_text)
+        recommendations = await generate_json(
+            prompt, "recommendation", schema=CAREERS_SCHEMA
+        )
 
         courses = recommendations.get("courses", [])
         careers = recommendations.get("careers", {})
@@ -188,10 +379,80 @@ Return the response as a valid JSON object with the following structure:
             "additional_resources": fetch_resources(careers),
             "message": message,
         }
-    except (json.JSONDecodeError, KeyError):
+    except (ValueError, KeyError):
         raise Exception("invalid gemini response")
 
 
+def create_local(profile: Profile, quiz_data: Dict[str, Any]) -> Dict[str, Any]:
+    answers = [
+        " ".join(qa["answer"]) if isinstance(qa["answer"], list) else str(qa["answer"])
+        for qa in quiz_data.get("history", [])
+    ]
+    features = recommender.extract_features(answers, [profile.stream or ""])
+
+    if profile.class_level == 9 or profile.class_level == 10:
+        return create_local_streams(features)
+    return create_local_careers(features)
+
+
+def create_local_streams(features: List[float]) -> Dict[str, Any]:
+    streams = recommender.top(recommender.score_streams(features), 3)
+
+    reasons = {}
+    for stream in streams:
+        interests = recommender.explain(recommender.STREAM_WEIGHTS[stream], features)
+        reasons[stream] = (
+            f"Your answers show interest in {' and '.join(interests)}, which {stream} builds on"
+            if interests
+            else f"{stream} keeps a wide range of further courses and careers open"
+        )
+
+    return {
+        "streams": streams,
+        "reasons": reasons,
+        "detailed_paths": {
+            stream: {
+                "courses": fetch_courses(stream),
+                "example_careers": fetch_careers(stream),
+            }
+            for stream in streams
+        },
+        "message": "These streams align with your interests, strengths, and preferences",
+        "source": "local",
+    }
+
+
+def create_local_careers(features: List[float]) -> Dict[str, Any]:
+    scores = recommender.score_courses(
+        features,
+        {stream: fetch_courses(stream) for stream in recommender.STREAM_WEIGHTS},
+    )
+    courses = recommender.top(
+        {course: score for course, (score, _) in scores.items()}, 3
+    )
+
+    careers = {}
+    reasons = {}
+    for course in courses:
+        stream = scores[course][1]
+        careers[course] = fetch_careers(stream)[:3]
+        interests = recommender.explain(recommender.STREAM_WEIGHTS[stream], features)
+        reasons[course] = (
+            f"Your answers show interest in {' and '.join(interests)}, which {course} develops"
+            if interests
+            else f"{course} is a common next step after {stream}"
+        )
+
+    return {
+        "courses": courses,
+        "careers": careers,
+        "reasons": reasons,
+        "additional_resources": fetch_resources(careers),
+        "message": "These specialized paths align with your specific interests and aptitudes",
+        "source": "local",
+    }
+
+
 def fetch_courses(stream: str) -> List[str]:
     stream_courses = {
         "Science (PCM)": ["B.Tech", "B.Sc Mathematics/Physics", "BCA", "B.Arch"],
@@ -306,6 +567,7 @@ def fetch_resources(
     resources = {}
 
     for course, career_list in careers.items():
+        course_exams = COURSE_EXAMS.classify(course)
         course_resources = []
 
         course_resources.append(
@@ -316,7 +578,7 @@ def fetch_resources(
             }
         )
 
-        if "Government" in course or any(c in course for c in ["B.Sc", "B.A", "B.Com"]):
+        if SCHOLARSHIP_COURSES.classify(course):
             course_resources.append(
                 {
                     "type": "scholarship",
@@ -325,7 +587,7 @@ def fetch_resources(
                 }
             )
 
-        if "B.Tech" in course or "Engineering" in course:
+        if "engineering" in course_exams:
             course_resources.append(
                 {
                     "type": "exam",
@@ -333,7 +595,7 @@ def fetch_resources(
                     "description": "Information about engineering entrance examinations",
                 }
             )
-        elif "MBBS" in course or "Medical" in course:
+        if "medical" in course_exams:
             course_resources.append(
                 {
                     "type": "exam",
@@ -343,8 +605,8 @@ def fetch_resources(
             )
 
         career_specific = []
-        for career in career_list:
-            if "Engineer" in career or "Developer" in career:
+        for career, paths in zip(career_list, CAREER_PATHS.classify_many(career_list)):
+            if "technical" in paths:
                 career_specific.append(
                     {
                         "type": "career_path",
@@ -352,7 +614,7 @@ def fetch_resources(
                         "description": f"Skills, certifications, and growth opportunities in {career}",
                     }
                 )
-            elif "Doctor" in career or "Medical" in career:
+            elif "medical" in paths:
                 career_specific.append(
                     {
                         "type": "career_path",
@@ -1,46 +1,75 @@
 import os
-import json
-import google.generativeai as genai
-from app.db import get_supabase
+from app.db import execute, get_supabase
+from app.llm import generate_json
+from app.resilience import DependencyUnavailable
+from app.classify import COURSE_EXAMS
+from app.context import (
+    ContextBuilder,
+    MILESTONE_FIELDS,
+    RECOMMENDATION_FIELDS,
+    TOP_COLLEGE_FIELDS,
+    project,
+)
+from app.pipeline import Pipeline
 from app.models import Profile
-from app.agents import recommendation_agent, college_agent
-from typing import Dict, Any, List
+from app.writes import write_queue
+from app.schemas import TIMELINE_SCHEMA
+from app.agents import college_agent
+from typing import Dict, Any, AsyncIterator, List, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.5-flash")
+TIMELINE_CONTEXT_TOKENS = int(os.getenv("TIMELINE_CONTEXT_TOKENS", "2000"))
 
 
 async def fetch_timeline(user_id: str, quiz_id: str) -> Dict[str, Any]:
-    supabase = get_supabase()
-
-    profile_result = (
-        supabase.table("profiles").select("*").eq("user_id", user_id).execute()
-    )
-    if not profile_result.data:
-        raise Exception("profile not found")
+    pipeline = build_pipeline(user_id, quiz_id)
+    timeline_data = await pipeline.get("timeline")
 
-    profile = Profile(**profile_result.data[0])
+    college_agent.store_colleges(user_id, await pipeline.get("colleges"))
+    store_timeline(user_id, timeline_data)
 
-    quiz_result = supabase.table("quizzes").select("*").eq("id", quiz_id).execute()
-    if not quiz_result.data:
-        raise Exception("quiz not found")
-
-    quiz_data = quiz_result.data[0]["quiz_json"]
+    return timeline_data
 
-    recommendations = await recommendation_agent.fetch_recommendations(user_id, quiz_id)
-    colleges_data = await college_agent.fetch_colleges(user_id, quiz_id)
 
-    timeline_data = await create_timeline(
-        profile, quiz_data, recommendations, colleges_data
+async def stream_timeline(user_id: str, quiz_id: str) -> AsyncIterator[Tuple[str, Any]]:
+    pipeline = build_pipeline(user_id, quiz_id)
+
+    async for event in pipeline.stream(
+        "recommendations", "college_data", "milestones", "colleges", "timeline"
+    ):
+        yield event
+
+    college_agent.store_colleges(user_id, await pipeline.get("colleges"))
+    store_timeline(user_id, await pipeline.get("timeline"))
+
+
+def build_pipeline(user_id: str, quiz_id: str) -> Pipeline:
+    pipeline = college_agent.build_pipeline(user_id, quiz_id)
+
+    async def milestones(
+        profile: Profile, recommendations: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        # only the class 12 plan names target colleges, so the other classes
+        # do not wait for the college recommendations
+        colleges_data = {}
+        if profile.class_level == 12:
+            colleges_data = await pipeline.get("colleges")
+        return create_milestones(profile, recommendations, colleges_data)
+
+    pipeline.add("milestones", milestones, "profile", "recommendations")
+    pipeline.add(
+        "timeline",
+        create_timeline,
+        "profile",
+        "quiz",
+        "recommendations",
+        "colleges",
+        "milestones",
     )
-
-    await store_timeline(user_id, timeline_data)
-
-    return timeline_data
+    return pipeline
 
 
 async def create_timeline(
@@ -48,17 +77,14 @@ async def create_timeline(
     quiz_data: Dict[str, Any],
     recommendations: Dict[str, Any],
     colleges_data: Dict[str, Any],
+    timeline_milestones: List[Dict[str, Any]] | None = None,
 ) -> Dict[str, Any]:
     current_date = datetime.now()
     current_year = current_date.year
 
-    if profile.class_level == 9 or profile.class_level == 10:
-        streams = recommendations.get("streams", [])
-        timeline_milestones = generate_streams(profile, streams, current_date)
-    else:
-        courses = recommendations.get("courses", [])
-        timeline_milestones = generate_courses(
-            profile, courses, colleges_data, current_date
+    if timeline_milestones is None:
+        timeline_milestones = create_milestones(
+            profile, recommendations, colleges_data, current_date
         )
 
     intelligent_timeline = await generate_recommendations(
@@ -95,6 +121,22 @@ async def create_timeline(
     }
 
 
+def create_milestones(
+    profile: Profile,
+    recommendations: Dict[str, Any],
+    colleges_data: Dict[str, Any],
+    current_date: datetime | None = None,
+) -> List[Dict[str, Any]]:
+    current_date = current_date or datetime.now()
+
+    if profile.class_level == 9 or profile.class_level == 10:
+        streams = recommendations.get("streams", [])
+        return generate_streams(profile, streams, current_date)
+    else:
+        courses = recommendations.get("courses", [])
+        return generate_courses(profile, courses, colleges_data, current_date)
+
+
 def generate_streams(
     profile: Profile, streams: List[str], current_date: datetime
 ) -> List[Dict[str, Any]]:
@@ -256,8 +298,8 @@ def generate_courses(
             ]
         )
 
-    for course in courses:
-        if "engineering" in course.lower() or "b.tech" in course.lower():
+    for course, exams in zip(courses, COURSE_EXAMS.classify_many(courses)):
+        if "engineering" in exams:
             milestones.append(
                 {
                     "title": "JEE Main/Advanced",
@@ -268,7 +310,7 @@ def generate_courses(
                     "related_courses": [course],
                 }
             )
-        elif "medical" in course.lower() or "mbbs" in course.lower():
+        if "medical" in exams:
             milestones.append(
                 {
                     "title": "NEET Examination",
@@ -279,7 +321,7 @@ def generate_courses(
                     "related_courses": [course],
                 }
             )
-        elif "management" in course.lower() or "mba" in course.lower():
+        if "management" in exams:
             milestones.append(
                 {
                     "title": "CAT/MAT Preparation",
@@ -300,6 +342,30 @@ async def generate_recommendations(
     colleges_data: Dict[str, Any],
     timeline_milestones: List[Dict[str, Any]],
 ) -> Dict[str, Any]:
+    college_recs = colleges_data.get("intelligent_recommendations", {})
+
+    # milestones go in before colleges so they are the last thing dropped
+    context = ContextBuilder(TIMELINE_CONTEXT_TOKENS)
+    context.add(
+        "CAREER RECOMMENDATIONS FROM SYSTEM",
+        project(recommendations, RECOMMENDATION_FIELDS),
+    )
+    context.add_items(
+        "GENERATED TIMELINE MILESTONES",
+        [project(milestone, MILESTONE_FIELDS) for milestone in timeline_milestones],
+    )
+    context.add("ADMISSION TIMELINE", college_recs.get("admission_timeline", {}))
+    context.add_items(
+        "COLLEGE OPTIONS IDENTIFIED",
+        [
+            project(college, TOP_COLLEGE_FIELDS)
+            for college in college_recs.get("top_colleges", [])
+        ],
+    )
+    print(
+        f"Timeline prompt context: {context.tokens} tokens, {context.dropped} items dropped"
+    )
+
     prompt = f"""You are an expert academic timeline counselor for Indian students. Based on the student's profile, career recommendations, college options, and milestone timeline, create a comprehensive action plan for academic success.
 
 STUDENT PROFILE:
@@ -310,14 +376,7 @@ STUDENT PROFILE:
 - Mobility: {profile.mobility}
 - Reservation Category: {profile.reservation_category}
 
-CAREER RECOMMENDATIONS FROM SYSTEM:
-{json.dumps(recommendations, indent=2)}
-
-COLLEGE OPTIONS IDENTIFIED:
-{json.dumps(colleges_data.get("intelligent_recommendations", {}), indent=2)}
-
-GENERATED TIMELINE MILESTONES:
-{json.dumps(timeline_milestones, indent=2)}
+{context.build()}
 
 INSTRUCTIONS:
 Create a comprehensive timeline plan that helps the student track their progress and achieve their recommended goals. Focus on:
@@ -365,19 +424,12 @@ Generate timeline plan in this JSON format:
 }}
 """
 
-    response = model.generate_content(prompt)
-
     try:
-        response_text = response.text.strip()
-
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].strip()
-
-        intelligent_timeline = json.loads(response_text)
+        intelligent_timeline = await generate_json(
+            prompt, "timeline", schema=TIMELINE_SCHEMA
+        )
         return intelligent_timeline
-    except (json.JSONDecodeError, KeyError):
+    except (ValueError, KeyError, DependencyUnavailable):
         return {
             "immediate_actions": [
                 {
@@ -414,37 +466,28 @@ Generate timeline plan in this JSON format:
         }
 
 
-async def store_timeline(user_id: str, timeline_data: Dict[str, Any]) -> None:
-    supabase = get_supabase()
-
-    try:
-        timeline_record = {
-            "user_id": user_id,
-            "timeline_json": timeline_data,
-            "source": "timeline_agent",
-            "updated_at": "now()",
-        }
+def store_timeline(user_id: str, timeline_data: Dict[str, Any]) -> None:
+    timeline_record = {
+        "user_id": user_id,
+        "timeline_json": timeline_data,
+        "source": "timeline_agent",
+        "updated_at": "now()",
+    }
 
-        existing = (
-            supabase.table("timelines").select("*").eq("user_id", user_id).execute()
-        )
-
-        if existing.data:
-            supabase.table("timelines").update(timeline_record).eq(
-                "user_id", user_id
-            ).execute()
-        else:
-            supabase.table("timelines").insert(timeline_record).execute()
-    except Exception:
-        pass
+    write_queue.put("timelines", timeline_record, "user_id")
 
 
 async def get_timeline(user_id: str) -> Dict[str, Any]:
+    # a timeline generated moments ago may not have reached the table yet
+    pending = write_queue.peek("timelines", "user_id", (user_id,))
+    if pending is not None:
+        return pending["timeline_json"]
+
     supabase = get_supabase()
 
     try:
-        result = (
-            supabase.table("timelines").select("*").eq("user_id", user_id).execute()
+        result = await execute(
+            supabase.table("timelines").select("*").eq("user_id", user_id), read=True
         )
         if result.data:
             return result.data[0]["timeline_json"]
@@ -1,30 +1,81 @@
+import os
+import time
+import hashlib
+import jwt
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.db import get_supabase
+from app.cache import LRUCache
+from app.db import call, get_supabase
 from typing import Dict, Any
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+AUTH_REMOTE_VERIFY = os.getenv("AUTH_REMOTE_VERIFY", "false").lower() == "true"
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
 
 security = HTTPBearer()
+token_cache = LRUCache(AUTH_CACHE_SIZE)
 
 
 async def get_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> Dict[str, Any]:
-    try:
-        supabase = get_supabase()
+    token = credentials.credentials
+    key = hashlib.sha256(token.encode()).hexdigest()
 
-        user = supabase.auth.get_user(credentials.credentials)
+    cached = token_cache.get(key)
+    if cached is not None:
+        return cached
 
-        if user is None:
-            raise HTTPException(401, "Invalid authentication token")
+    try:
+        claims = verify_token(token)
 
-        return {
-            "user_id": user.user.id,
-            "email": user.user.email,
-        }
+        if claims is None or AUTH_REMOTE_VERIFY:
+            user = await verify_remote(token)
+        else:
+            user = {"user_id": claims["sub"], "email": claims.get("email")}
 
     except Exception as e:
         raise HTTPException(401, f"Authentication failed: {str(e)}")
 
+    ttl = AUTH_CACHE_TTL
+    if claims is not None and "exp" in claims:
+        ttl = min(ttl, claims["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(key, user, ttl=ttl)
+
+    return user
+
+
+def verify_token(token: str) -> Dict[str, Any] | None:
+    if not SUPABASE_JWT_SECRET:
+        return None
+
+    return jwt.decode(
+        token,
+        SUPABASE_JWT_SECRET,
+        algorithms=["HS256"],
+        audience="authenticated",
+        options={"require": ["exp", "sub"]},
+    )
+
+
+async def verify_remote(token: str) -> Dict[str, Any]:
+    supabase = get_supabase()
+
+    user = await call(supabase.auth.get_user, token, read=True)
+
+    if user is None:
+        raise HTTPException(401, "Invalid authentication token")
+
+    return {
+        "user_id": user.user.id,
+        "email": user.user.email,
+    }
+
 
 async def get_optional(
     credentials: HTTPAuthorizationCredentials = Depends(security),
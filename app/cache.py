@@ -0,0 +1,145 @@
+import os
+import copy
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+PRUNE_INTERVAL = 100
+
+
+class LRUCache:
+    """In-process least-recently-used cache with a fixed entry cap."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.entries: OrderedDict[Hashable, Tuple[Any, float | None]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Any | None:
+        if key not in self.entries:
+            return None
+
+        value, expires_at = self.entries[key]
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self.entries[key] = (value, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [key for key in self.entries if predicate(key)]:
+            del self.entries[key]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class ResponseCache:
+    """Two-tier cache: an LRU in memory and an optional SQLite file on disk."""
+
+    def __init__(
+        self, maxsize: int, path: str | None = None, disk_maxsize: int = 10000
+    ) -> None:
+        self.memory = LRUCache(maxsize)
+        self.disk_maxsize = disk_maxsize
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.disk_errors = 0
+        self.lock = threading.Lock()
+        self.db = None
+
+        if path:
+            # the disk tier is best-effort: without it the cache is memory-only
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self.db = sqlite3.connect(path, check_same_thread=False)
+                self.db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses "
+                    "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+                )
+                self.db.commit()
+            except (OSError, sqlite3.Error) as e:
+                self.disk_errors += 1
+                self.db = None
+                print(f"Disk cache at {path} unavailable: {e}")
+
+    async def get(self, key: str) -> Any | None:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return copy.deepcopy(value)
+
+        if self.db is not None:
+            try:
+                row = await asyncio.to_thread(self.read, key)
+            except sqlite3.Error:
+                self.disk_errors += 1
+                row = None
+            if row is not None:
+                value, expires_at = row
+                self.memory.set(key, value, ttl=expires_at - time.time())
+                self.hits += 1
+                self.disk_hits += 1
+                return copy.deepcopy(value)
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self.memory.set(key, copy.deepcopy(value), ttl=ttl)
+
+        if self.db is not None:
+            try:
+                await asyncio.to_thread(self.write, key, value, time.time() + ttl)
+            except sqlite3.Error:
+                self.disk_errors += 1
+
+    def read(self, key: str) -> Tuple[Any, float] | None:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def write(self, key: str, value: Any, expires_at: float) -> None:
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            self.writes += 1
+            if self.writes % PRUNE_INTERVAL == 0:
+                self.db.execute(
+                    "DELETE FROM responses WHERE expires_at <= ? OR key NOT IN "
+                    "(SELECT key FROM responses ORDER BY expires_at DESC LIMIT ?)",
+                    (time.time(), self.disk_maxsize),
+                )
+            self.db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_errors": self.disk_errors,
+        }
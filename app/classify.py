@@ -0,0 +1,155 @@
+import re
+import bisect
+from typing import Dict, List, Sequence, Tuple
+
+CLASSIFY_CACHE_SIZE = 4096
+
+# (label, priority, keywords); a keyword ending in "*" also matches longer
+# words, so "engineer*" covers "engineering". Only the highest-priority
+# rules that match an input contribute labels.
+Rule = Tuple[str, int, Sequence[str]]
+
+
+class Classifier:
+    """Keyword rules compiled into one regex and matched in a single pass.
+
+    Alternatives are ordered longest first, so the most specific keyword
+    wins where two overlap ("ba fine arts" before "ba").
+    """
+
+    def __init__(self, rules: Sequence[Rule], default: Sequence[str] = ()) -> None:
+        self.default = list(default)
+        self.keywords: Dict[str, List[Tuple[int, int, str]]] = {}
+        for order, (label, priority, keywords) in enumerate(rules):
+            for keyword in keywords:
+                key = keyword.rstrip("*").lower()
+                self.keywords.setdefault(key, []).append((priority, order, label))
+
+        stems = {
+            k.rstrip("*").lower() for _, _, kws in rules for k in kws if k[-1] == "*"
+        }
+        alternatives = sorted(self.keywords, key=len, reverse=True)
+        self.pattern = re.compile(
+            r"(?<![a-z0-9])(?:"
+            + "|".join(
+                re.escape(key) + ("" if key in stems else r"(?![a-z0-9])")
+                for key in alternatives
+            )
+            + ")"
+        )
+        self.cache: Dict[str, Tuple[str, ...]] = {}
+
+    def classify(self, text: str) -> Tuple[str, ...]:
+        return self.classify_many([text])[0]
+
+    def classify_many(self, texts: Sequence[str]) -> List[Tuple[str, ...]]:
+        misses = list(dict.fromkeys(text for text in texts if text not in self.cache))
+        if not misses:
+            return [self.cache[text] for text in texts]
+
+        # one scan over the joined batch; match offsets map back to inputs.
+        # Lowercase per text, since lower() can change the length ("İ").
+        lowered = [text.lower() for text in misses]
+        starts = []
+        offset = 0
+        for text in lowered:
+            starts.append(offset)
+            offset += len(text) + 1
+
+        matches: List[List[str]] = [[] for _ in misses]
+        for found in self.pattern.finditer("\n".join(lowered)):
+            index = bisect.bisect_right(starts, found.start()) - 1
+            matches[index].append(found.group())
+
+        resolved = {text: self.resolve(found) for text, found in zip(misses, matches)}
+        # read hits before evicting, or a clear would drop them mid-batch
+        results = [
+            resolved[text] if text in resolved else self.cache[text] for text in texts
+        ]
+
+        if len(self.cache) + len(resolved) > CLASSIFY_CACHE_SIZE:
+            self.cache.clear()
+        for text, labels in resolved.items():
+            if len(self.cache) >= CLASSIFY_CACHE_SIZE:
+                break
+            self.cache[text] = labels
+
+        return results
+
+    def resolve(self, matches: Sequence[str]) -> Tuple[str, ...]:
+        hits = [hit for match in matches for hit in self.keywords[match]]
+        if not hits:
+            return ()
+
+        best = max(priority for priority, _, _ in hits)
+        labels = sorted(
+            {(order, label) for priority, order, label in hits if priority == best}
+        )
+        return tuple(dict.fromkeys(label for _, label in labels))
+
+    def labels(self, texts: Sequence[str]) -> List[str]:
+        found = [label for result in self.classify_many(texts) for label in result]
+        return list(dict.fromkeys(found)) or list(self.default)
+
+
+DEFAULT_FIELDS = ["engineering", "medical", "management"]
+
+STREAM_FIELDS = Classifier(
+    [
+        ("engineering", 3, ["pcm", "physics", "computer science"]),
+        ("medical", 3, ["pcb", "biology"]),
+        ("architecture", 3, ["fine arts"]),
+        ("management", 2, ["commerce"]),
+        ("law", 2, ["languages", "mass comm*"]),
+        ("engineering", 2, ["vocational", "skill-based"]),
+        ("medical", 2, ["vocational", "skill-based"]),
+        ("management", 2, ["vocational", "skill-based"]),
+        ("engineering", 1, ["science"]),
+        ("medical", 1, ["science"]),
+        ("law", 1, ["arts", "humanities"]),
+    ],
+    default=DEFAULT_FIELDS,
+)
+
+COURSE_FIELDS = Classifier(
+    [
+        ("engineering", 2, ["b.tech*", "btech", "diploma", "iti"]),
+        ("medical", 2, ["mbbs", "b.sc nursing", "paramedical"]),
+        ("pharmacy", 2, ["b.pharm*", "pharm.d", "d.pharm*"]),
+        ("dental", 2, ["bds"]),
+        ("management", 2, ["b.com", "bba", "mba", "ca foundation", "banking*"]),
+        ("management", 2, ["hospitality", "hotel management"]),
+        ("law", 2, ["ba", "b.a", "b.ed", "law", "llb", "ba llb"]),
+        ("law", 2, ["mass communication", "journalism"]),
+        ("architecture", 2, ["b.arch", "ba fine arts", "design*"]),
+        ("engineering", 1, ["tech*", "engineer*", "computer*", "mechanical"]),
+        ("engineering", 1, ["civil", "electrical", "electronics"]),
+        ("medical", 1, ["medical", "medicine", "doctor", "nurs*"]),
+        ("pharmacy", 1, ["pharmac*"]),
+        ("dental", 1, ["dental", "dentist*"]),
+        ("management", 1, ["commerce", "management", "business", "financ*"]),
+        ("management", 1, ["economics"]),
+        ("architecture", 1, ["architect*", "fine arts"]),
+        ("law", 1, ["legal", "arts", "humanities", "social"]),
+    ],
+    default=DEFAULT_FIELDS,
+)
+
+COURSE_EXAMS = Classifier(
+    [
+        ("engineering", 1, ["b.tech*", "btech", "engineer*"]),
+        ("medical", 1, ["mbbs", "medical"]),
+        ("management", 1, ["management", "mba"]),
+    ]
+)
+
+SCHOLARSHIP_COURSES = Classifier(
+    [("scholarship", 1, ["government", "b.sc*", "b.a", "ba", "b.com"])]
+)
+
+CAREER_PATHS = Classifier(
+    [
+        ("technical", 1, ["engineer*", "developer*"]),
+        ("medical", 1, ["doctor*", "medical"]),
+    ]
+)
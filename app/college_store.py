@@ -0,0 +1,465 @@
+import os
+import json
+import heapq
+import base64
+import bisect
+import difflib
+import asyncio
+import httpx
+from app.college_table import CollegeTable
+from app.resilience import Breaker, DependencyUnavailable, register
+from app.locations import ALIASES, canonical, normalize
+from itertools import islice
+from typing import Dict, Any, Callable, Iterator, List, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_URL = "https://raw.githubusercontent.com/Clueless-Community/collegeAPI/main/data"
+COLLEGE_DATA_DIR = os.getenv("COLLEGE_DATA_DIR", ".cache/colleges")
+LOCATION_MATCH_CUTOFF = float(os.getenv("LOCATION_MATCH_CUTOFF", "0.85"))
+COLLEGE_API_TIMEOUT = float(os.getenv("COLLEGE_API_TIMEOUT", "30"))
+LOCATION_CACHE_SIZE = 10000
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+FILE_MAPPING = {
+    "engineering": "engineering_ranking.json",
+    "medical": "medical_ranking.json",
+    "management": "management_ranking.json",
+    "agriculture": "allAgriculture.json",
+    "dental": "dental_ranking.json",
+    "law": "law_ranking.json",
+    "pharmacy": "pharmacy_ranking.json",
+    "architecture": "architecture_ranking.json",
+}
+
+_records: Dict[str, List[Dict[str, Any]]] = {}
+_state_index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+_city_index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+_locks: Dict[str, asyncio.Lock] = {}
+
+# canonical location id -> display name, per location kind
+_names: Dict[str, Dict[str, str]] = {"state": {}, "city": {}}
+_resolved: Dict[Tuple[str, str], str] = {}
+_terms: Dict[str, List[Tuple[str, str]]] = {}
+
+# lowercase column -> key as spelled in the dataset, per field
+_columns: Dict[str, Dict[str, str]] = {}
+_numeric: Dict[str, set] = {}
+_sorted: Dict[Tuple[str, str, str, str, bool], List[Dict[str, Any]]] = {}
+_table = CollegeTable()
+
+college_api_breaker = register(Breaker("college_api", COLLEGE_API_TIMEOUT))
+
+
+def location_keys(field: str) -> Tuple[str, str]:
+    if field == "agriculture":
+        return "State", "City"
+    return "state", "city"
+
+
+def build_index(field: str, colleges: List[Dict[str, Any]]) -> None:
+    state_key, city_key = location_keys(field)
+
+    _columns[field] = {key.lower(): key for college in colleges for key in college}
+    _numeric[field] = {
+        column
+        for column, key in _columns[field].items()
+        if any(number(college.get(key)) is not None for college in colleges)
+    }
+
+    # records are indexed in rank order, so every location bucket comes out
+    # presorted and the default search order is a plain slice
+    if "rank" in _numeric[field]:
+        colleges = sorted(colleges, key=sort_key(field, "rank", False))
+
+    locations = []
+    for college in colleges:
+        state = canonical("state", college.get(state_key))
+        city = canonical("city", college.get(city_key))
+        if state:
+            _state_index.setdefault((field, state), []).append(college)
+            remember("state", state, college[state_key])
+        if city:
+            _city_index.setdefault((field, city), []).append(college)
+            remember("city", city, college[city_key])
+        locations.append((state, city))
+
+    rank_key = _columns[field].get("rank")
+    score_key = _columns[field].get("score")
+    _table.add_field(
+        field,
+        colleges,
+        locations,
+        [number(college.get(rank_key)) for college in colleges],
+        [number(college.get(score_key)) for college in colleges],
+    )
+    _records[field] = colleges
+    _resolved.clear()
+    _terms.clear()
+
+
+def number(value: Any) -> float | None:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def sort_key(
+    field: str, column: str, descending: bool
+) -> Callable[[Dict[str, Any]], Tuple[bool, float]]:
+    key = _columns[field].get(column)
+
+    def college_key(college: Dict[str, Any]) -> Tuple[bool, float]:
+        value = number(college.get(key))
+        if value is None:
+            return True, 0.0
+        return False, -value if descending else value
+
+    return college_key
+
+
+def remember(kind: str, name: str, raw: Any) -> None:
+    # prefer a spelling of the canonical name itself over an alias
+    if name not in _names[kind] or normalize(raw) == name:
+        _names[kind][name] = " ".join(str(raw).split())
+
+
+def resolve(kind: str, location: str) -> str:
+    name = canonical(kind, location)
+    key = (kind, name)
+    if key in _resolved:
+        return _resolved[key]
+
+    # misspellings fall back to the closest known name before giving up
+    known = _names.get(kind, {})
+    if name not in known:
+        matches = difflib.get_close_matches(name, known, 1, LOCATION_MATCH_CUTOFF)
+        if matches:
+            name = matches[0]
+
+    if len(_resolved) < LOCATION_CACHE_SIZE:
+        _resolved[key] = name
+    return name
+
+
+def suggest(kind: str, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+    known = _names.get(kind, {})
+    if kind not in _terms:
+        # every word start of a name or alias is searchable, so "pradesh"
+        # finds "Uttar Pradesh" and "bangalore" finds Bengaluru
+        terms = [(alias, name) for alias, name in ALIASES[kind].items()] + [
+            (name, name) for name in known
+        ]
+        _terms[kind] = sorted(
+            (" ".join(words[start:]), name)
+            for term, name in terms
+            if name in known
+            for words in [term.split()]
+            for start in range(len(words))
+        )
+
+    terms = _terms[kind]
+    prefix = normalize(prefix)
+    index = _state_index if kind == "state" else _city_index
+    results = {}
+    position = bisect.bisect_left(terms, (prefix, ""))
+    while position < len(terms) and len(results) < limit:
+        term, name = terms[position]
+        if not term.startswith(prefix):
+            break
+        if name not in results:
+            results[name] = {
+                "id": name,
+                "name": known[name],
+                "colleges": sum(
+                    len(index.get((field, name), [])) for field in _records
+                ),
+            }
+        position += 1
+
+    return list(results.values())
+
+
+def read_local(filename: str) -> List[Dict[str, Any]] | None:
+    path = os.path.join(COLLEGE_DATA_DIR, filename)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def write_local(filename: str, content: bytes) -> None:
+    try:
+        os.makedirs(COLLEGE_DATA_DIR, exist_ok=True)
+        path = os.path.join(COLLEGE_DATA_DIR, filename)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(content)
+        os.replace(f"{path}.tmp", path)
+    except OSError:
+        pass
+
+
+async def download(filename: str) -> List[Dict[str, Any]]:
+    async def get() -> httpx.Response:
+        async with httpx.AsyncClient(timeout=COLLEGE_API_TIMEOUT) as client:
+            response = await client.get(f"{BASE_URL}/{filename}")
+            response.raise_for_status()
+            return response
+
+    response = await college_api_breaker.call(get)
+
+    colleges = await asyncio.to_thread(json.loads, response.content)
+    await asyncio.to_thread(write_local, filename, response.content)
+    return colleges
+
+
+async def load_field(field: str) -> bool:
+    if field in _records:
+        return True
+
+    filename = FILE_MAPPING.get(field)
+    if not filename:
+        return False
+
+    lock = _locks.setdefault(field, asyncio.Lock())
+    async with lock:
+        if field in _records:
+            return True
+
+        try:
+            colleges = await asyncio.to_thread(read_local, filename)
+            if colleges is None:
+                colleges = await download(filename)
+        except (
+            httpx.RequestError,
+            httpx.HTTPStatusError,
+            json.JSONDecodeError,
+            DependencyUnavailable,
+        ):
+            return False
+
+        build_index(field, colleges)
+        return True
+
+
+async def warm_store() -> None:
+    await asyncio.gather(
+        *(load_field(field) for field in FILE_MAPPING), return_exceptions=True
+    )
+
+
+def lookup(field: str, filter_type: str, location: str) -> List[Dict[str, Any]]:
+    if filter_type == "state":
+        index = _state_index
+    elif filter_type == "city":
+        index = _city_index
+    else:
+        return []
+
+    return list(index.get((field, resolve(filter_type, location)), []))
+
+
+async def find_colleges(
+    field: str, filter_type: str, location: str
+) -> List[Dict[str, Any]]:
+    if not location:
+        return []
+
+    if not await load_field(field):
+        return []
+
+    return lookup(field, filter_type, location)
+
+
+def sorted_bucket(
+    field: str, filter_type: str, location: str, sort: str, descending: bool
+) -> List[Dict[str, Any]]:
+    if filter_type == "state":
+        bucket = _state_index.get((field, location), [])
+    elif filter_type == "city":
+        bucket = _city_index.get((field, location), [])
+    else:
+        bucket = _records[field]
+
+    if sort == "rank" and not descending:
+        return bucket
+    if sort not in _numeric[field]:
+        raise ValueError(f"cannot sort {field} colleges by {sort}")
+    if not bucket:
+        # unknown locations come through unresolved; caching them would let
+        # user input grow _sorted without bound
+        return bucket
+
+    key = (field, filter_type, location, sort, descending)
+    if key not in _sorted:
+        _sorted[key] = sorted(bucket, key=sort_key(field, sort, descending))
+    return _sorted[key]
+
+
+def keyed(
+    field: str, bucket: List[Dict[str, Any]], sort: str, descending: bool
+) -> Iterator[Tuple[Tuple[bool, float], int, str, Dict[str, Any]]]:
+    college_key = sort_key(field, sort, descending)
+    for position, college in enumerate(bucket):
+        yield college_key(college), position, field, college
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def decode_cursor(cursor: str | None) -> int:
+    if not cursor:
+        return 0
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise ValueError("invalid cursor")
+    if offset < 0:
+        raise ValueError("invalid cursor")
+    return offset
+
+
+async def search(
+    fields: List[str],
+    filter_type: str | None = None,
+    location: str | None = None,
+    sort: str = "rank",
+    descending: bool = False,
+    limit: int = SEARCH_PAGE_SIZE,
+    cursor: str | None = None,
+    select: List[str] | None = None,
+) -> Dict[str, Any]:
+    offset = decode_cursor(cursor)
+    limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+    if location:
+        if filter_type not in ("state", "city"):
+            raise ValueError(f"invalid location type: {filter_type}")
+        location = resolve(filter_type, location)
+    else:
+        filter_type = None
+
+    fields, unavailable = await load_fields(fields)
+    buckets = [
+        (field, sorted_bucket(field, filter_type, location, sort, descending))
+        for field in fields
+    ]
+
+    total = sum(len(bucket) for _, bucket in buckets)
+    if len(buckets) == 1:
+        field, bucket = buckets[0]
+        page = [(field, college) for college in bucket[offset : offset + limit]]
+    else:
+        # each bucket is already in order, so a lazy merge only walks as far
+        # as the requested page
+        merged = heapq.merge(
+            *(keyed(field, bucket, sort, descending) for field, bucket in buckets)
+        )
+        page = [
+            (field, college)
+            for _, _, field, college in islice(merged, offset, offset + limit)
+        ]
+
+    return {
+        "colleges": [present(field, college, select) for field, college in page],
+        "total": total,
+        "next_cursor": encode_cursor(offset + limit)
+        if offset + limit < total
+        else None,
+        "unavailable_fields": unavailable,
+    }
+
+
+async def load_fields(fields: List[str]) -> Tuple[List[str], List[str]]:
+    # unknown names are the caller's mistake; files that fail to load are
+    # skipped and reported, and only an empty result is an outage
+    for field in fields:
+        if field not in FILE_MAPPING:
+            raise ValueError(f"unknown field: {field}")
+
+    loaded = await asyncio.gather(*(load_field(field) for field in fields))
+    available = [field for field, ok in zip(fields, loaded) if ok]
+    unavailable = [field for field, ok in zip(fields, loaded) if not ok]
+    if unavailable and not available:
+        raise DependencyUnavailable(
+            f"college data unavailable: {', '.join(unavailable)}"
+        )
+    return available, unavailable
+
+
+async def filter_colleges(
+    fields: List[str] | None = None,
+    state: str | None = None,
+    city: str | None = None,
+    max_rank: float | None = None,
+    min_score: float | None = None,
+    limit: int = SEARCH_PAGE_SIZE,
+    cursor: str | None = None,
+    select: List[str] | None = None,
+) -> Dict[str, Any]:
+    fields = fields or list(FILE_MAPPING)
+    start = decode_cursor(cursor)
+    limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+
+    fields, unavailable = await load_fields(fields)
+    mask = _table.mask(
+        fields,
+        state=resolve("state", state) if state else None,
+        city=resolve("city", city) if city else None,
+        max_rank=max_rank,
+        min_score=min_score,
+    )
+    rows = list(islice(_table.scan(mask, start - 1), limit + 1))
+    page = rows[:limit]
+
+    return {
+        "colleges": [
+            present(_table.field_of[row], _table.rows[row], select) for row in page
+        ],
+        "total": mask.bit_count(),
+        "counts": _table.counts(mask),
+        "next_cursor": encode_cursor(page[-1] + 1) if len(rows) > limit else None,
+        "unavailable_fields": unavailable,
+    }
+
+
+def present(
+    field: str, college: Dict[str, Any], select: List[str] | None
+) -> Dict[str, Any]:
+    if select:
+        college = {
+            column: college[_columns[field][column]]
+            for column in select
+            if column in _columns[field]
+        }
+    return {"field": field, **college}
+
+
+async def suggest_locations(
+    kind: str, prefix: str, limit: int = 10
+) -> List[Dict[str, Any]]:
+    if kind not in ALIASES:
+        return []
+
+    await warm_store()
+    return suggest(kind, prefix, limit)
+
+
+async def find_by_location(
+    field: str, state: str, city: str
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    if not await load_field(field):
+        return [], []
+
+    by_state = lookup(field, "state", state) if state else []
+    by_city = lookup(field, "city", city) if city else []
+    return by_state, by_city
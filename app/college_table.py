@@ -0,0 +1,115 @@
+import bisect
+from array import array
+from typing import Any, Dict, Iterator, List, Tuple
+
+INF = float("inf")
+
+
+class CollegeTable:
+    """Column store over every loaded field, filtered with bitset masks.
+
+    Each field occupies a contiguous run of rows in rank order. A filter is
+    a Python int with one bit per row, so combining criteria is a single
+    big-integer AND rather than a loop over records.
+    """
+
+    def __init__(self) -> None:
+        self.rows: List[Dict[str, Any]] = []
+        self.field_of: List[str] = []
+        self.segments: Dict[str, Tuple[int, int]] = {}
+        self.rank = array("d")
+        self.score = array("d")
+        self.states: Dict[str, int] = {}
+        self.cities: Dict[str, int] = {}
+        self.by_score: List[Tuple[float, int]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add_field(
+        self,
+        field: str,
+        colleges: List[Dict[str, Any]],
+        locations: List[Tuple[str, str]],
+        ranks: List[float | None],
+        scores: List[float | None],
+    ) -> None:
+        start = len(self.rows)
+        for row, (college, (state, city), rank, score) in enumerate(
+            zip(colleges, locations, ranks, scores), start
+        ):
+            self.rows.append(college)
+            self.field_of.append(field)
+            self.rank.append(INF if rank is None else rank)
+            self.score.append(-INF if score is None else score)
+
+            bit = 1 << row
+            if state:
+                self.states[state] = self.states.get(state, 0) | bit
+            if city:
+                self.cities[city] = self.cities.get(city, 0) | bit
+
+        self.segments[field] = (start, len(self.rows))
+        self.by_score = None
+
+    def field_mask(self, field: str) -> int:
+        start, end = self.segments.get(field, (0, 0))
+        return ((1 << (end - start)) - 1) << start
+
+    def rank_mask(self, field: str, max_rank: float) -> int:
+        # rows inside a segment are rank-sorted, so "rank <= n" is a prefix
+        start, end = self.segments.get(field, (0, 0))
+        stop = bisect.bisect_right(self.rank, max_rank, start, end)
+        return ((1 << (stop - start)) - 1) << start
+
+    def score_mask(self, min_score: float) -> int:
+        if self.by_score is None:
+            self.by_score = sorted(
+                ((-score, row) for row, score in enumerate(self.score)),
+            )
+
+        stop = bisect.bisect_right(self.by_score, (-min_score, len(self.rows)))
+        mask = 0
+        for _, row in self.by_score[:stop]:
+            mask |= 1 << row
+        return mask
+
+    def mask(
+        self,
+        fields: List[str],
+        state: str | None = None,
+        city: str | None = None,
+        max_rank: float | None = None,
+        min_score: float | None = None,
+    ) -> int:
+        mask = 0
+        for field in fields:
+            if max_rank is None:
+                mask |= self.field_mask(field)
+            else:
+                mask |= self.rank_mask(field, max_rank)
+
+        if state is not None:
+            mask &= self.states.get(state, 0)
+        if city is not None:
+            mask &= self.cities.get(city, 0)
+        if min_score is not None:
+            mask &= self.score_mask(min_score)
+        return mask
+
+    def counts(self, mask: int) -> Dict[str, int]:
+        return {
+            field: (mask & self.field_mask(field)).bit_count()
+            for field in self.segments
+            if mask & self.field_mask(field)
+        }
+
+    def scan(self, mask: int, after: int = -1) -> Iterator[int]:
+        mask >>= after + 1
+        row = after + 1
+        while mask:
+            skip = (mask & -mask).bit_length() - 1
+            row += skip
+            yield row
+            mask >>= skip + 1
+            row += 1
@@ -0,0 +1,102 @@
+import json
+from app.llm import estimate_tokens
+from typing import Any, Dict, Iterable, List
+
+COLLEGE_FIELDS = ("name", "city", "state", "rank", "score")
+RECOMMENDATION_FIELDS = ("streams", "courses", "careers", "reasons")
+TOP_COLLEGE_FIELDS = (
+    "name",
+    "field",
+    "location",
+    "rank",
+    "fit_score",
+    "estimated_fees",
+)
+MILESTONE_FIELDS = ("title", "type", "date", "priority", "description")
+
+
+def compact(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def project(record: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    # college datasets disagree on key casing ("name" vs "Name"), so fields
+    # are matched case-insensitively and empty values are dropped
+    wanted = {field.lower() for field in fields}
+    return {
+        key.lower(): value
+        for key, value in record.items()
+        if key.lower() in wanted and value not in (None, "", [], {})
+    }
+
+
+def rank_value(college: Dict[str, Any]) -> float:
+    try:
+        return float(college.get("rank"))
+    except (TypeError, ValueError):
+        return float("inf")
+
+
+def rank_colleges(college_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten per-field matches into one list, best candidates first.
+
+    City matches come before the rest of the state, each ordered by rank, and
+    fields are interleaved so a tight budget still covers every field.
+    """
+    per_field = []
+    for field, data in college_data.items():
+        seen = set()
+        candidates = []
+        for group in ("city_colleges", "state_colleges"):
+            ranked = sorted(
+                (project(college, COLLEGE_FIELDS) for college in data.get(group, [])),
+                key=rank_value,
+            )
+            for college in ranked:
+                key = compact(college)
+                if key not in seen:
+                    seen.add(key)
+                    candidates.append({"field": field, **college})
+        per_field.append(candidates)
+
+    ranked = []
+    for position in range(max((len(c) for c in per_field), default=0)):
+        ranked.extend(c[position] for c in per_field if position < len(c))
+    return ranked
+
+
+class ContextBuilder:
+    """Assemble prompt sections under a token budget.
+
+    Sections added with ``add`` are always kept; ``add_items`` keeps as many
+    items as the remaining budget allows, in the order given.
+    """
+
+    def __init__(self, budget: int) -> None:
+        self.budget = budget
+        self.tokens = 0
+        self.sections: List[str] = []
+        self.dropped = 0
+
+    def add(self, title: str, value: Any) -> None:
+        self.append(f"{title}:\n{compact(value)}")
+
+    def add_items(self, title: str, items: List[Any]) -> None:
+        kept = []
+        remaining = self.budget - self.tokens - estimate_tokens(title) - 1
+        for item in items:
+            cost = estimate_tokens(compact(item))
+            if cost > remaining:
+                break
+            kept.append(item)
+            remaining -= cost
+
+        self.dropped += len(items) - len(kept)
+        self.append(f"{title}:\n{compact(kept)}")
+
+    def append(self, section: str) -> None:
+        self.sections.append(section)
+        self.tokens += estimate_tokens(section)
+
+    def build(self) -> str:
+        return "\n\n".join(self.sections)
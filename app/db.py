@@ -1,12 +1,123 @@
 import os
-from supabase import create_client, Client
+import httpx
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from app.resilience import Breaker, register
+from postgrest.exceptions import APIError
+from supabase import AuthApiError, create_client, Client, ClientOptions
+from typing import Any, Callable
 from dotenv import load_dotenv
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_PROJECT_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_API_KEY")
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "60"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "120"))
+SUPABASE_CALL_TIMEOUT = float(os.getenv("SUPABASE_CALL_TIMEOUT", "10"))
+# a thread the breaker gave up on must not outlive the call deadline
+SUPABASE_HTTP_TIMEOUT = min(SUPABASE_TIMEOUT, SUPABASE_CALL_TIMEOUT)
+# resend a read that has not answered after this many seconds (0 disables)
+SUPABASE_HEDGE_DELAY = float(os.getenv("SUPABASE_HEDGE_DELAY", "0"))
+
+_supabase: Client | None = None
+_data_pool: httpx.Client | None = None
+_auth_pool: httpx.Client | None = None
+# Supabase calls block a thread each; a dedicated pool keeps a slow database
+# from starving other asyncio.to_thread users such as the disk cache
+_executor: ThreadPoolExecutor | None = None
+
+# PostgREST and auth errors (constraint violations, bad tokens) come from a
+# healthy service, so they do not trip the breaker
+supabase_breaker = register(
+    Breaker("supabase", SUPABASE_CALL_TIMEOUT, ignore=(APIError, AuthApiError))
+)
+
+
+def create_pool() -> httpx.Client:
+    return httpx.Client(
+        http2=True,
+        follow_redirects=True,
+        timeout=SUPABASE_HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_POOL_SIZE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def init_supabase() -> Client:
+    global _supabase, _data_pool, _auth_pool, _executor
+
+    if _supabase is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=SUPABASE_POOL_SIZE, thread_name_prefix="supabase"
+        )
+        _data_pool = create_pool()
+        _auth_pool = create_pool()
+        _supabase = create_client(
+            SUPABASE_URL,
+            SUPABASE_KEY,
+            options=ClientOptions(
+                httpx_client=_data_pool,
+                persist_session=False,
+                auto_refresh_token=False,
+            ),
+        )
+
+    return _supabase
+
+
+def close_supabase() -> None:
+    global _supabase, _data_pool, _auth_pool, _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+
+    for pool in (_data_pool, _auth_pool):
+        if pool is not None:
+            pool.close()
+
+    _supabase = None
+    _data_pool = None
+    _auth_pool = None
+    _executor = None
 
 
 def get_supabase() -> Client:
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    if _supabase is None:
+        return init_supabase()
+    return _supabase
+
+
+def get_auth_client() -> Client:
+    # sign in/up/out and refresh change the client's session, so they get a
+    # throwaway client on the auth pool instead of the shared data client
+    init_supabase()
+    return create_client(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        options=ClientOptions(
+            httpx_client=_auth_pool,
+            persist_session=False,
+            auto_refresh_token=False,
+        ),
+    )
+
+
+async def execute(query: Any, read: bool = False) -> Any:
+    # only reads are safe to hedge
+    return await call(query.execute, read=read)
+
+
+async def call(func: Callable[..., Any], *args: Any, read: bool = False) -> Any:
+    # runs a blocking Supabase call on the dedicated pool behind the
+    # supabase breaker
+    init_supabase()
+    loop = asyncio.get_running_loop()
+    return await supabase_breaker.call(
+        lambda: loop.run_in_executor(_executor, func, *args),
+        hedge=SUPABASE_HEDGE_DELAY if read else 0,
+    )
@@ -0,0 +1,152 @@
+import os
+import time
+import uuid
+import asyncio
+from app.agents import college_agent, timeline_agent
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "2"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+
+
+class Job:
+    def __init__(self, kind: str, user_id: str, quiz_id: str) -> None:
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.user_id = user_id
+        self.quiz_id = quiz_id
+        self.status = "queued"
+        self.attempts = 0
+        self.result: Dict[str, Any] | None = None
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.finished_at: float | None = None
+        self.finished = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "quiz_id": self.quiz_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """In-process job queue served by a fixed pool of worker tasks."""
+
+    def __init__(
+        self, handlers: Dict[str, Callable[[str, str], Awaitable[Dict[str, Any]]]]
+    ) -> None:
+        self.handlers = handlers
+        self.jobs: Dict[str, Job] = {}
+        self.active: Dict[Tuple[str, str, str], Job] = {}
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(JOB_QUEUE_SIZE)
+        self.workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self.workers = [asyncio.create_task(self.work()) for _ in range(JOB_WORKERS)]
+
+    async def stop(self) -> None:
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(self, kind: str, user_id: str, quiz_id: str) -> Job:
+        if kind not in self.handlers:
+            raise ValueError(f"unknown job kind: {kind}")
+
+        key = (kind, user_id, quiz_id)
+        if key in self.active:
+            return self.active[key]
+
+        self.prune()
+        job = Job(kind, user_id, quiz_id)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        self.active[key] = job
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        try:
+            await asyncio.wait_for(job.finished.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    async def work(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                await self.run(job)
+            finally:
+                self.queue.task_done()
+
+    async def run(self, job: Job) -> None:
+        job.status = "running"
+        job.attempts += 1
+
+        try:
+            job.result = await self.handlers[job.kind](job.user_id, job.quiz_id)
+        except Exception as e:
+            job.error = str(e)
+            if job.attempts < JOB_MAX_ATTEMPTS:
+                job.status = "retrying"
+                delay = JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+                asyncio.get_running_loop().call_later(delay, self.requeue, job)
+                return
+            self.finish(job, "failed")
+            return
+
+        job.error = None
+        self.finish(job, "completed")
+
+    def requeue(self, job: Job) -> None:
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.finish(job, "failed")
+
+    def finish(self, job: Job, status: str) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        self.active.pop((job.kind, job.user_id, job.quiz_id), None)
+        job.finished.set()
+
+    def prune(self) -> None:
+        cutoff = time.time() - JOB_RESULT_TTL
+        for job_id in [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]:
+            del self.jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self.workers),
+            "queued": self.queue.qsize(),
+            "active": len(self.active),
+            "retained": len(self.jobs),
+        }
+
+
+job_queue = JobQueue(
+    {
+        "colleges": college_agent.fetch_colleges,
+        "timeline": timeline_agent.fetch_timeline,
+    }
+)
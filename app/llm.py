@@ -0,0 +1,142 @@
+import os
+import re
+import json
+import hashlib
+import google.generativeai as genai
+from collections import Counter
+from app.cache import ResponseCache
+from app.resilience import Breaker, register
+from app.scheduler import llm_scheduler
+from app.schemas import check, is_strict
+from typing import Any, Callable, Dict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+LLM_CACHE_DISK_SIZE = int(os.getenv("LLM_CACHE_DISK_SIZE", "10000"))
+LLM_JSON_RETRIES = int(os.getenv("LLM_JSON_RETRIES", "1"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+
+LLM_CACHE_TTL = {
+    "quiz": 6 * 3600,
+    "recommendation": 24 * 3600,
+    "college": 24 * 3600,
+    "timeline": 12 * 3600,
+}
+DEFAULT_CACHE_TTL = 3600
+
+genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+model = genai.GenerativeModel(GEMINI_MODEL)
+
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+gemini_breaker = register(Breaker("gemini", GEMINI_TIMEOUT))
+
+response_cache = ResponseCache(
+    LLM_CACHE_SIZE, path=LLM_CACHE_PATH, disk_maxsize=LLM_CACHE_DISK_SIZE
+)
+
+# outcome counts per agent: ok, repaired, retried, failed
+json_stats: Dict[str, Counter] = {}
+
+
+async def generate_text(prompt: str, schema: Dict[str, Any] | None = None) -> str:
+    generation_config = None
+    if schema is not None:
+        generation_config = {"response_mime_type": "application/json"}
+        if is_strict(schema):
+            generation_config["response_schema"] = schema
+
+    response = await gemini_breaker.call(
+        lambda: model.generate_content_async(
+            prompt, generation_config=generation_config
+        )
+    )
+    return response.text
+
+
+async def generate_json(
+    prompt: str,
+    agent: str,
+    schema: Dict[str, Any] | None = None,
+    validate: Callable[[Any], Any] | None = None,
+    priority: str | None = None,
+) -> Any:
+    key = hashlib.sha256(f"{GEMINI_MODEL}\n{prompt}".encode()).hexdigest()
+
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    stats = json_stats.setdefault(agent, Counter())
+    attempt_prompt = prompt
+    for attempt in range(LLM_JSON_RETRIES + 1):
+        # queue by priority class; defaults to the agent's own class
+        async with llm_scheduler.slot(priority or agent):
+            text = await generate_text(attempt_prompt, schema)
+        try:
+            result = parse_json(text, stats)
+            if schema is not None:
+                check(result, schema)
+            if validate is not None:
+                result = validate(result)
+            break
+        except (ValueError, KeyError) as e:
+            if attempt == LLM_JSON_RETRIES:
+                stats["failed"] += 1
+                raise
+            stats["retried"] += 1
+            attempt_prompt = (
+                f"{prompt}\n\nYour previous reply was rejected ({e}). "
+                "Reply with only the JSON object in the format above."
+            )
+
+    stats["ok"] += 1
+    await response_cache.set(key, result, LLM_CACHE_TTL.get(agent, DEFAULT_CACHE_TTL))
+    return result
+
+
+def parse_json(response_text: str, stats: Counter | None = None) -> Any:
+    response_text = response_text.strip()
+
+    if "```json" in response_text:
+        response_text = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        response_text = response_text.split("```")[1].strip()
+
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        repaired = repair_json(response_text)
+        if repaired == response_text:
+            raise
+
+    result = json.loads(repaired)
+    if stats is not None:
+        stats["repaired"] += 1
+    return result
+
+
+def repair_json(text: str) -> str:
+    # cut away prose around the outermost object or array, then drop the
+    # trailing commas models like to leave before a closing bracket
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if starts:
+        start = min(starts)
+        end = max(text.rfind("}"), text.rfind("]"))
+        if end > start:
+            text = text[start : end + 1]
+
+    return TRAILING_COMMA.sub(r"\1", text)
+
+
+def json_metrics() -> Dict[str, Dict[str, int]]:
+    return {agent: dict(stats) for agent, stats in json_stats.items()}
+
+
+def estimate_tokens(text: str) -> int:
+    # roughly four characters per token for Gemini on mixed English text
+    return len(text) // 4 + 1
@@ -0,0 +1,63 @@
+import re
+from typing import Any
+
+# Alternate spellings mapped to one canonical name. Keys and values are
+# already normalized; the canonical name doubles as the location's id.
+STATE_ALIASES = {
+    "orissa": "odisha",
+    "pondicherry": "puducherry",
+    "uttaranchal": "uttarakhand",
+    "tamilnadu": "tamil nadu",
+    "chattisgarh": "chhattisgarh",
+    "telengana": "telangana",
+    "nct of delhi": "delhi",
+    "new delhi": "delhi",
+    "j and k": "jammu and kashmir",
+    "up": "uttar pradesh",
+    "mp": "madhya pradesh",
+    "ap": "andhra pradesh",
+    "hp": "himachal pradesh",
+    "wb": "west bengal",
+}
+
+CITY_ALIASES = {
+    "bangalore": "bengaluru",
+    "bombay": "mumbai",
+    "navi mumbai": "mumbai",
+    "madras": "chennai",
+    "calcutta": "kolkata",
+    "poona": "pune",
+    "gurgaon": "gurugram",
+    "mysore": "mysuru",
+    "mangalore": "mangaluru",
+    "belgaum": "belagavi",
+    "hubli": "hubballi",
+    "trivandrum": "thiruvananthapuram",
+    "cochin": "kochi",
+    "ernakulam": "kochi",
+    "calicut": "kozhikode",
+    "baroda": "vadodara",
+    "benares": "varanasi",
+    "banaras": "varanasi",
+    "allahabad": "prayagraj",
+    "pondicherry": "puducherry",
+    "vizag": "visakhapatnam",
+    "trichy": "tiruchirappalli",
+    "tiruchirapalli": "tiruchirappalli",
+    "new delhi": "delhi",
+    "secunderabad": "hyderabad",
+}
+
+ALIASES = {"state": STATE_ALIASES, "city": CITY_ALIASES}
+
+SEPARATORS = re.compile(r"[\s.,\-_/]+")
+
+
+def normalize(value: Any) -> str:
+    text = str(value or "").lower().replace("&", " and ")
+    return " ".join(SEPARATORS.split(text)).strip()
+
+
+def canonical(kind: str, value: Any) -> str:
+    name = normalize(value)
+    return ALIASES.get(kind, {}).get(name, name)
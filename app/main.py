@@ -1,8 +1,35 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, profile, quiz, recommend, colleges, timeline
+from app.db import init_supabase, close_supabase
+from app.college_store import warm_store
+from app.llm import json_metrics, response_cache
+from app.jobs import job_queue
+from app.resilience import breaker_stats
+from app.scheduler import llm_scheduler
+from app.writes import write_queue
+from app.agents import quiz_agent
+from app.routes import auth, profile, quiz, recommend, colleges, timeline, jobs
 
-app = FastAPI(title="udaan.ai", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_supabase()
+    warmup = asyncio.create_task(warm_store())
+    flusher = asyncio.create_task(quiz_agent.run_session_flusher())
+    job_queue.start()
+    write_queue.start()
+    yield
+    await job_queue.stop()
+    flusher.cancel()
+    await asyncio.gather(flusher, return_exceptions=True)
+    await write_queue.stop()
+    warmup.cancel()
+    close_supabase()
+
+
+app = FastAPI(title="udaan.ai", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +45,7 @@ app.include_router(quiz.router)
 app.include_router(recommend.router)
 app.include_router(colleges.router)
 app.include_router(timeline.router)
+app.include_router(jobs.router)
 
 
 @app.get("/health")
@@ -25,6 +53,18 @@ async def health_check():
     return {"server": "ok"}
 
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "llm_cache": response_cache.stats(),
+        "llm_json": json_metrics(),
+        "jobs": job_queue.stats(),
+        "writes": write_queue.stats(),
+        "breakers": breaker_stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -56,6 +56,7 @@ class Quiz(BaseModel):
 class QuizResponseCreate(BaseModel):
     user_id: str
     quiz_id: str
+    question_number: int
     answers: Dict[str, Any]
 
 
@@ -63,6 +64,7 @@ class QuizResponse(BaseModel):
     id: str
     user_id: str
     quiz_id: str
+    question_number: int
     answers: Dict[str, Any]
     created_at: datetime
 
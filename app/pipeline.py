@@ -0,0 +1,44 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Tuple
+
+
+class Pipeline:
+    """Request-scoped dependency graph; each node runs at most once."""
+
+    def __init__(self) -> None:
+        self.nodes: Dict[
+            str, Tuple[Callable[..., Awaitable[Any]], Tuple[str, ...]]
+        ] = {}
+        self.tasks: Dict[str, asyncio.Future] = {}
+
+    def add(
+        self, name: str, func: Callable[..., Awaitable[Any]], *deps: str
+    ) -> "Pipeline":
+        self.nodes[name] = (func, deps)
+        return self
+
+    async def get(self, name: str) -> Any:
+        if name not in self.tasks:
+            if name not in self.nodes:
+                raise KeyError(f"unknown pipeline node: {name}")
+            self.tasks[name] = asyncio.ensure_future(self.run(name))
+        return await self.tasks[name]
+
+    async def run(self, name: str) -> Any:
+        func, deps = self.nodes[name]
+        values = await asyncio.gather(*(self.get(dep) for dep in deps))
+        return await func(*values)
+
+    async def stream(self, *names: str) -> AsyncIterator[Tuple[str, Any]]:
+        pending = {asyncio.ensure_future(self.get(name)): name for name in names}
+
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in [future for future in pending if future in done]:
+                    yield pending.pop(future), future.result()
+        finally:
+            for future in pending:
+                future.cancel()
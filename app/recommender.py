@@ -0,0 +1,163 @@
+from app.classify import COURSE_FIELDS, Classifier
+from typing import Dict, List, Sequence, Tuple
+
+# Interest dimensions read off quiz answers and the profile. Every weight
+# table below has one column per feature, in this order.
+FEATURES = [
+    "math",
+    "physics",
+    "biology",
+    "computers",
+    "business",
+    "finance",
+    "arts",
+    "language",
+    "social",
+    "practical",
+]
+
+FEATURE_NAMES = {
+    "math": "mathematics",
+    "physics": "physics and how things work",
+    "biology": "biology and health",
+    "computers": "computers and technology",
+    "business": "business and management",
+    "finance": "finance and accounts",
+    "arts": "art and design",
+    "language": "languages and writing",
+    "social": "people and society",
+    "practical": "hands-on, practical work",
+}
+
+INTERESTS = Classifier(
+    [
+        ("math", 1, ["math*", "maths", "numbers", "calculat*", "pcm", "statistic*"]),
+        ("math", 1, ["logic*", "puzzle*", "problem solving", "problem-solving"]),
+        ("physics", 1, ["physics", "pcm", "machine*", "mechani*", "engineer*"]),
+        ("physics", 1, ["build*", "robot*", "electric*", "space", "invent*"]),
+        ("biology", 1, ["biolog*", "pcb", "medic*", "doctor*", "health*"]),
+        ("biology", 1, ["hospital*", "nurs*", "patient*", "animal*", "plant*"]),
+        ("computers", 1, ["computer*", "coding", "code", "program*", "software"]),
+        ("computers", 1, ["technolog*", "tech", "app", "apps", "gaming", "ai"]),
+        ("business", 1, ["business*", "commerce", "manag*", "lead*", "entrepreneur*"]),
+        ("business", 1, ["market*", "sell*", "sales", "startup*", "shop*"]),
+        ("finance", 1, ["financ*", "account*", "bank*", "money", "invest*", "tax*"]),
+        ("finance", 1, ["economics", "budget*", "commerce"]),
+        ("arts", 1, ["art", "arts", "draw*", "paint*", "design*", "music*"]),
+        ("arts", 1, ["danc*", "creativ*", "animation", "photograph*", "fashion"]),
+        ("language", 1, ["language*", "writ*", "reading", "stor*", "english"]),
+        ("language", 1, ["journalis*", "media", "mass comm*", "debat*", "speak*"]),
+        ("social", 1, ["social", "people", "society", "teach*", "law", "legal"]),
+        ("social", 1, ["history", "politic*", "helping", "help others", "humanities"]),
+        ("practical", 1, ["hands-on", "practical*", "repair*", "vocational", "skill*"]),
+        ("practical", 1, ["craft*", "outdoor*", "cook*", "travel*", "hospitality"]),
+    ]
+)
+
+# Stream taxonomy of the recommendation agent, one row per stream. Columns
+# follow FEATURES: math, physics, biology, computers, business, finance,
+# arts, language, social, practical.
+# fmt: off
+STREAM_WEIGHTS: Dict[str, Tuple[float, ...]] = {
+    "Science (PCM)":                  (3.0, 3.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0),
+    "Science (PCB)":                  (0.5, 0.5, 3.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0),
+    "Science with Computer Science":  (2.0, 1.0, 0.0, 3.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0),
+    "Commerce with Mathematics":      (2.0, 0.0, 0.0, 0.0, 1.0, 3.0, 0.0, 0.0, 0.0, 0.0),
+    "Commerce with Business Studies": (0.0, 0.0, 0.0, 0.0, 3.0, 1.5, 0.0, 0.5, 0.5, 0.0),
+    "Commerce":                       (0.5, 0.0, 0.0, 0.0, 2.0, 2.0, 0.0, 0.0, 0.0, 0.0),
+    "Arts with Fine Arts":            (0.0, 0.0, 0.0, 0.5, 0.0, 0.0, 3.0, 0.5, 0.0, 1.0),
+    "Arts with Languages/Mass Comm":  (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5, 3.0, 1.0, 0.0),
+    "Arts/Humanities":                (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5, 1.0, 3.0, 0.0),
+    "Vocational/Skill-based courses": (0.0, 0.5, 0.0, 0.0, 0.5, 0.0, 0.5, 0.0, 0.0, 3.0),
+}
+# fmt: on
+
+# Tie-breaker when the answers carry little signal: the most common picks.
+STREAM_PRIOR = {
+    "Science (PCM)": 0.3,
+    "Commerce": 0.2,
+    "Science (PCB)": 0.2,
+    "Arts/Humanities": 0.1,
+}
+
+# Course-level adjustment on top of the parent stream, keyed by the
+# COURSE_FIELDS label of the course name. Same columns as above.
+# fmt: off
+FIELD_WEIGHTS: Dict[str, Tuple[float, ...]] = {
+    "engineering":  (1.0, 1.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5),
+    "medical":      (0.0, 0.0, 1.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5, 0.0),
+    "pharmacy":     (0.0, 0.5, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5),
+    "dental":       (0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.5),
+    "management":   (0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.5, 0.0),
+    "law":          (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 0.0),
+    "architecture": (0.5, 0.5, 0.0, 0.0, 0.0, 0.0, 1.5, 0.0, 0.0, 0.5),
+}
+# fmt: on
+
+# The profile's own stream counts for this many quiz answers.
+PROFILE_WEIGHT = 3.0
+
+
+def extract_features(
+    answers: Sequence[str], profile_texts: Sequence[str] = ()
+) -> List[float]:
+    index = {feature: i for i, feature in enumerate(FEATURES)}
+    vector = [0.0] * len(FEATURES)
+
+    for weight, texts in ((1.0, answers), (PROFILE_WEIGHT, profile_texts)):
+        for labels in INTERESTS.classify_many([text for text in texts if text]):
+            for label in labels:
+                vector[index[label]] += weight
+
+    total = sum(vector)
+    return [value / total for value in vector] if total else vector
+
+
+def dot(weights: Sequence[float], features: Sequence[float]) -> float:
+    return sum(w * f for w, f in zip(weights, features))
+
+
+def score_streams(features: Sequence[float]) -> Dict[str, float]:
+    return {
+        stream: dot(weights, features) + STREAM_PRIOR.get(stream, 0.0)
+        for stream, weights in STREAM_WEIGHTS.items()
+    }
+
+
+def score_courses(
+    features: Sequence[float], stream_courses: Dict[str, List[str]]
+) -> Dict[str, Tuple[float, str]]:
+    # course -> (score, parent stream); a course listed under several
+    # streams keeps its best parent
+    streams = score_streams(features)
+    fields = COURSE_FIELDS.classify_many(
+        [course for courses in stream_courses.values() for course in courses]
+    )
+
+    scores: Dict[str, Tuple[float, str]] = {}
+    position = 0
+    for stream, courses in stream_courses.items():
+        for course in courses:
+            labels = [label for label in fields[position] if label in FIELD_WEIGHTS]
+            position += 1
+
+            bonus = max(
+                (dot(FIELD_WEIGHTS[label], features) for label in labels), default=0.0
+            )
+            score = streams.get(stream, 0.0) + bonus
+            if course not in scores or score > scores[course][0]:
+                scores[course] = (score, stream)
+
+    return scores
+
+
+def top(scores: Dict[str, float], limit: int) -> List[str]:
+    # stable on ties, so equal scores keep taxonomy order
+    return sorted(scores, key=lambda name: -scores[name])[:limit]
+
+
+def explain(weights: Sequence[float], features: Sequence[float]) -> List[str]:
+    contributions = sorted(
+        ((-(w * f), i) for i, (w, f) in enumerate(zip(weights, features)) if w * f > 0)
+    )
+    return [FEATURE_NAMES[FEATURES[i]] for _, i in contributions[:2]]
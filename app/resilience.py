@@ -0,0 +1,147 @@
+import os
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple, Type
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", "30"))
+
+
+class DependencyUnavailable(Exception):
+    """A dependency timed out or its breaker is open; use the fallback."""
+
+
+class Breaker:
+    """Timeout plus circuit breaker for one outbound dependency.
+
+    After `failures` consecutive failures the breaker opens and calls fail
+    at once with DependencyUnavailable. Once `reset` seconds have passed a
+    single trial call is let through; its outcome closes or reopens it.
+    Exceptions listed in `ignore` are passed through without counting as
+    failures (an API error still means the dependency answered).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        failures: int = BREAKER_FAILURES,
+        reset: float = BREAKER_RESET,
+        ignore: Tuple[Type[BaseException], ...] = (),
+    ) -> None:
+        self.name = name
+        self.timeout = timeout
+        self.max_failures = failures
+        self.reset = reset
+        self.ignore = ignore
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.rejected = 0
+        self.hedged = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset:
+            return "open"
+        return "half_open"
+
+    async def call(self, func: Callable[[], Awaitable[Any]], hedge: float = 0) -> Any:
+        state = self.state
+        if state == "open" or (state == "half_open" and self.probing):
+            self.rejected += 1
+            raise DependencyUnavailable(f"{self.name} circuit open")
+
+        probe = state == "half_open"
+        if probe:
+            self.probing = True
+        self.calls += 1
+
+        try:
+            if hedge > 0:
+                result = await asyncio.wait_for(self.hedge(func, hedge), self.timeout)
+            else:
+                result = await asyncio.wait_for(func(), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.record_failure()
+            raise DependencyUnavailable(f"{self.name} timed out after {self.timeout}s")
+        except self.ignore:
+            self.record_success()
+            raise
+        except Exception:
+            self.errors += 1
+            self.record_failure()
+            raise
+        finally:
+            if probe:
+                self.probing = False
+
+        self.record_success()
+        return result
+
+    async def hedge(self, func: Callable[[], Awaitable[Any]], delay: float) -> Any:
+        # for idempotent reads only: if the first attempt is slow, race a
+        # second one and keep whichever succeeds first
+        tasks = {asyncio.ensure_future(func())}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedged += 1
+                tasks.add(asyncio.ensure_future(func()))
+
+            error: BaseException | None = None
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.max_failures:
+            if self.opened_at is None:
+                print(f"Circuit for {self.name} opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "hedged": self.hedged,
+        }
+
+
+breakers: Dict[str, Breaker] = {}
+
+
+def register(breaker: Breaker) -> Breaker:
+    breakers[breaker.name] = breaker
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.stats() for name, breaker in breakers.items()}
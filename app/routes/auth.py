@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from app.db import get_supabase
+from app.db import execute, get_supabase, get_auth_client
 from app.models import UserSignUp, UserSignIn, AuthResponse
 from typing import Dict, Any
 
@@ -9,9 +9,9 @@ router = APIRouter(prefix="/api/v1/auth")
 @router.post("/signup", response_model=AuthResponse)
 async def user_signup(user_data: UserSignUp) -> AuthResponse:
     try:
-        supabase = get_supabase()
+        auth_client = get_auth_client()
 
-        auth_response = supabase.auth.sign_up(
+        auth_response = auth_client.auth.sign_up(
             {
                 "email": user_data.email,
                 "password": user_data.password,
@@ -30,8 +30,10 @@ async def user_signup(user_data: UserSignUp) -> AuthResponse:
 
         profile_exists = False
         try:
-            profile_result = (
-                supabase.table("profiles").select("*").eq("user_id", user.id).execute()
+            supabase = get_supabase()
+            profile_result = await execute(
+                supabase.table("profiles").select("*").eq("user_id", user.id),
+                read=True,
             )
             profile_exists = len(profile_result.data) > 0
         except Exception:
@@ -54,9 +56,9 @@ async def user_signup(user_data: UserSignUp) -> AuthResponse:
 @router.post("/signin", response_model=AuthResponse)
 async def user_signin(user_data: UserSignIn) -> AuthResponse:
     try:
-        supabase = get_supabase()
+        auth_client = get_auth_client()
 
-        auth_response = supabase.auth.sign_in_with_password(
+        auth_response = auth_client.auth.sign_in_with_password(
             {"email": user_data.email, "password": user_data.password}
         )
 
@@ -71,8 +73,10 @@ async def user_signin(user_data: UserSignIn) -> AuthResponse:
 
         profile_exists = False
         try:
-            profile_result = (
-                supabase.table("profiles").select("*").eq("user_id", user.id).execute()
+            supabase = get_supabase()
+            profile_result = await execute(
+                supabase.table("profiles").select("*").eq("user_id", user.id),
+                read=True,
             )
             profile_exists = len(profile_result.data) > 0
         except Exception:
@@ -95,8 +99,8 @@ async def user_signin(user_data: UserSignIn) -> AuthResponse:
 @router.post("/logout")
 async def user_logout() -> Dict[str, str]:
     try:
-        supabase = get_supabase()
-        supabase.auth.sign_out()
+        auth_client = get_auth_client()
+        auth_client.auth.sign_out()
         return {"message": "Successfully signed out"}
 
     except Exception as e:
@@ -108,8 +112,9 @@ async def get_userdata(user_id: str) -> Dict[str, Any]:
     try:
         supabase = get_supabase()
 
-        profile_result = (
-            supabase.table("profiles").select("*").eq("user_id", user_id).execute()
+        profile_result = await execute(
+            supabase.table("profiles").select("*").eq("user_id", user_id),
+            read=True,
         )
 
         if not profile_result.data:
@@ -124,9 +129,9 @@ async def get_userdata(user_id: str) -> Dict[str, Any]:
 @router.post("/refresh")
 async def refresh_token(refresh_token: str) -> Dict[str, str]:
     try:
-        supabase = get_supabase()
+        auth_client = get_auth_client()
 
-        auth_response = supabase.auth.refresh_session(refresh_token)
+        auth_response = auth_client.auth.refresh_session(refresh_token)
 
         if auth_response.session is None:
             raise HTTPException(401, "Invalid refresh token")
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from app import college_store
 from app.agents import college_agent
 from app.auth import get_user
+from app.jobs import job_queue
+from app.resilience import DependencyUnavailable
+from app.streaming import sse_response
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 router = APIRouter(prefix="/api/v1/colleges")
 
@@ -25,6 +31,94 @@ async def fetch_colleges(
         raise HTTPException(500, str(e))
 
 
+@router.post("/stream")
+async def stream_colleges(
+    request: CollegeRequestAuth, current_user: Dict[str, Any] = Depends(get_user)
+) -> StreamingResponse:
+    user_id = current_user["user_id"]
+    return sse_response(college_agent.stream_colleges(user_id, request.quiz_id))
+
+
+@router.post("/jobs", status_code=202)
+async def submit_colleges_job(
+    request: CollegeRequestAuth, current_user: Dict[str, Any] = Depends(get_user)
+) -> Dict[str, Any]:
+    try:
+        user_id = current_user["user_id"]
+        job = job_queue.submit("colleges", user_id, request.quiz_id)
+        return job.to_dict()
+    except asyncio.QueueFull:
+        raise HTTPException(503, "job queue is full")
+
+
+@router.get("/locations")
+async def suggest_locations(
+    q: str = Query(..., min_length=1),
+    type: str = Query("city", pattern="^(state|city)$"),
+    limit: int = Query(10, ge=1, le=50),
+) -> Dict[str, Any]:
+    locations = await college_store.suggest_locations(type, q, limit)
+    return {"locations": locations, "count": len(locations)}
+
+
+@router.get("/search")
+async def search(
+    fields: str = Query(
+        ..., description="Comma-separated fields, e.g. engineering,medical"
+    ),
+    location_type: str = Query("state", pattern="^(state|city)$"),
+    location: Optional[str] = None,
+    sort: str = "rank",
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    select: Optional[str] = None,
+) -> Dict[str, Any]:
+    try:
+        return await college_store.search(
+            split_list(fields),
+            location_type,
+            location,
+            sort=sort.lower(),
+            descending=order == "desc",
+            limit=limit,
+            cursor=cursor,
+            select=split_list(select),
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except DependencyUnavailable as e:
+        raise HTTPException(503, str(e))
+
+
+@router.get("/filter")
+async def filter_colleges(
+    fields: Optional[str] = None,
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    max_rank: Optional[float] = None,
+    min_score: Optional[float] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    select: Optional[str] = None,
+) -> Dict[str, Any]:
+    try:
+        return await college_store.filter_colleges(
+            split_list(fields),
+            state=state,
+            city=city,
+            max_rank=max_rank,
+            min_score=min_score,
+            limit=limit,
+            cursor=cursor,
+            select=split_list(select),
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except DependencyUnavailable as e:
+        raise HTTPException(503, str(e))
+
+
 @router.get("/search/{field}/{location_type}/{location}")
 async def search_colleges(
     field: str, location_type: str, location: str
@@ -34,3 +128,9 @@ async def search_colleges(
         return {"colleges": colleges, "count": len(colleges)}
     except Exception as e:
         raise HTTPException(500, str(e))
+
+
+def split_list(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
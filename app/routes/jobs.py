@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException, Depends
+from app.auth import get_user
+from app.jobs import job_queue
+from typing import Dict, Any
+
+router = APIRouter(prefix="/api/v1/jobs")
+
+MAX_WAIT_SECONDS = 30
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str, wait: float = 0, current_user: Dict[str, Any] = Depends(get_user)
+) -> Dict[str, Any]:
+    job = job_queue.get(job_id)
+    if not job or job.user_id != current_user["user_id"]:
+        raise HTTPException(404, "job not found")
+
+    if wait > 0:
+        await job_queue.wait(job, min(wait, MAX_WAIT_SECONDS))
+
+    return job.to_dict()
@@ -23,8 +23,9 @@ async def start_quiz(
 ) -> Dict[str, Any]:
     try:
         user_id = current_user["user_id"]
-        result = await quiz_agent.generate_question(user_id)
-        result["total_questions"] = request.max_questions
+        result = await quiz_agent.generate_question(
+            user_id, max_questions=request.max_questions
+        )
         return result
     except Exception as e:
         raise HTTPException(500, str(e))
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from app.agents import recommendation_agent
 from app.auth import get_user
+from app.streaming import sse_response
 from pydantic import BaseModel
 from typing import Dict, Any
 
@@ -23,3 +25,13 @@ async def fetch_recommendations(
         return recommendations
     except Exception as e:
         raise HTTPException(500, str(e))
+
+
+@router.post("/stream")
+async def stream_recommendations(
+    request: RecommendationRequest, current_user: Dict[str, Any] = Depends(get_user)
+) -> StreamingResponse:
+    user_id = current_user["user_id"]
+    return sse_response(
+        recommendation_agent.stream_recommendations(user_id, request.quiz_id)
+    )
@@ -1,6 +1,10 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from app.agents import timeline_agent
 from app.auth import get_user
+from app.jobs import job_queue
+from app.streaming import sse_response
 from pydantic import BaseModel
 from typing import Dict, Any
 
@@ -23,6 +27,26 @@ async def fetch_timeline(
         raise HTTPException(500, str(e))
 
 
+@router.post("/stream")
+async def stream_timeline(
+    request: TimelineRequestAuth, current_user: Dict[str, Any] = Depends(get_user)
+) -> StreamingResponse:
+    user_id = current_user["user_id"]
+    return sse_response(timeline_agent.stream_timeline(user_id, request.quiz_id))
+
+
+@router.post("/jobs", status_code=202)
+async def submit_timeline_job(
+    request: TimelineRequestAuth, current_user: Dict[str, Any] = Depends(get_user)
+) -> Dict[str, Any]:
+    try:
+        user_id = current_user["user_id"]
+        job = job_queue.submit("timeline", user_id, request.quiz_id)
+        return job.to_dict()
+    except asyncio.QueueFull:
+        raise HTTPException(503, "job queue is full")
+
+
 @router.get("/")
 async def get_timeline(
     current_user: Dict[str, Any] = Depends(get_user),
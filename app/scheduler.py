@@ -0,0 +1,194 @@
+import os
+import time
+import heapq
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from app.resilience import DependencyUnavailable
+from typing import Any, AsyncIterator, Deque, Dict, List, Sequence, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# requests per minute allowed by the Gemini quota (0 disables the limit)
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "300"))
+GEMINI_BURST = float(os.getenv("GEMINI_BURST", "20"))
+GEMINI_MAX_INFLIGHT = int(os.getenv("GEMINI_MAX_INFLIGHT", "16"))
+WAIT_SAMPLES = 1000
+
+# lower runs first; anything unlisted queues behind these
+PRIORITIES = {
+    "quiz": 0,
+    "recommendation": 1,
+    "college": 2,
+    "timeline": 3,
+    "prefetch": 4,
+}
+LOWEST_PRIORITY = 5
+
+# seconds a call may wait for a slot before giving up and using its fallback
+QUEUE_DEADLINES = {
+    "quiz": 10,
+    "recommendation": 15,
+    "college": 30,
+    "timeline": 60,
+    "prefetch": 5,
+}
+DEFAULT_QUEUE_DEADLINE = 30
+
+Waiter = Tuple[int, int, float, str, asyncio.Future]
+
+
+class LLMScheduler:
+    """Process-wide gate in front of Gemini.
+
+    A call needs both a token from the rate-limit bucket and one of the
+    in-flight slots. Waiting calls are granted strictly by priority, then
+    arrival order; a call still queued at its deadline fails with
+    DependencyUnavailable so the agent can fall back.
+    """
+
+    def __init__(self, rpm: float, burst: float, max_inflight: int) -> None:
+        self.rate = rpm / 60
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.refilled = time.monotonic()
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.queue: List[Waiter] = []
+        self.sequence = 0
+        self.timer: asyncio.TimerHandle | None = None
+        self.waits: Dict[str, Deque[float]] = {}
+        self.granted: Dict[str, int] = {}
+        self.expired: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def slot(self, name: str) -> AsyncIterator[None]:
+        await self.acquire(name)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, name: str) -> None:
+        enqueued = time.monotonic()
+        deadline = QUEUE_DEADLINES.get(name, DEFAULT_QUEUE_DEADLINE)
+        future = asyncio.get_running_loop().create_future()
+
+        self.sequence += 1
+        heapq.heappush(
+            self.queue,
+            (
+                PRIORITIES.get(name, LOWEST_PRIORITY),
+                self.sequence,
+                enqueued,
+                name,
+                future,
+            ),
+        )
+        self.dispatch()
+
+        try:
+            await asyncio.wait_for(future, deadline)
+        except asyncio.TimeoutError:
+            # granted in the same loop iteration the deadline fired
+            self.return_granted(future)
+            self.expired[name] = self.expired.get(name, 0) + 1
+            raise DependencyUnavailable(
+                f"gemini queue wait for {name} exceeded {deadline}s"
+            )
+        except asyncio.CancelledError:
+            # granted just before the caller went away
+            self.return_granted(future)
+            raise
+
+    def return_granted(self, future: asyncio.Future) -> None:
+        if future.done() and not future.cancelled():
+            self.release()
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self.dispatch()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.refilled) * self.rate
+        )
+        self.refilled = now
+
+    def dispatch(self) -> None:
+        self.refill()
+
+        while self.queue and self.inflight < self.max_inflight:
+            _, _, enqueued, name, future = self.queue[0]
+            if future.done():
+                # timed out or cancelled while queued
+                heapq.heappop(self.queue)
+                continue
+
+            if self.rate > 0 and self.tokens < 1:
+                self.wake_after((1 - self.tokens) / self.rate)
+                return
+
+            heapq.heappop(self.queue)
+            if self.rate > 0:
+                self.tokens -= 1
+            self.inflight += 1
+            future.set_result(None)
+
+            waited = time.monotonic() - enqueued
+            self.waits.setdefault(name, deque(maxlen=WAIT_SAMPLES)).append(waited)
+            self.granted[name] = self.granted.get(name, 0) + 1
+
+    def wake_after(self, delay: float) -> None:
+        if self.timer is not None:
+            return
+
+        def wake() -> None:
+            self.timer = None
+            self.dispatch()
+
+        self.timer = asyncio.get_running_loop().call_later(delay, wake)
+
+    def stats(self) -> Dict[str, Any]:
+        self.refill()
+        queued: Dict[str, int] = {}
+        for _, _, _, name, future in self.queue:
+            if not future.done():
+                queued[name] = queued.get(name, 0) + 1
+
+        classes = {}
+        for name in sorted(
+            set(self.granted) | set(self.expired) | set(queued),
+            key=lambda name: PRIORITIES.get(name, LOWEST_PRIORITY),
+        ):
+            classes[name] = {
+                "queued": queued.get(name, 0),
+                "granted": self.granted.get(name, 0),
+                "expired": self.expired.get(name, 0),
+                **wait_summary(self.waits.get(name, ())),
+            }
+
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "tokens": round(self.tokens, 2),
+            "classes": classes,
+        }
+
+
+def wait_summary(waits: Sequence[float]) -> Dict[str, float]:
+    # queue wait of recently granted calls, in milliseconds
+    if not waits:
+        return {"wait_ms_avg": 0.0, "wait_ms_p95": 0.0, "wait_ms_max": 0.0}
+
+    ordered = sorted(waits)
+    return {
+        "wait_ms_avg": round(1000 * sum(ordered) / len(ordered), 1),
+        "wait_ms_p95": round(1000 * ordered[int(0.95 * len(ordered))], 1),
+        "wait_ms_max": round(1000 * ordered[-1], 1),
+    }
+
+
+llm_scheduler = LLMScheduler(GEMINI_RPM, GEMINI_BURST, GEMINI_MAX_INFLIGHT)
@@ -0,0 +1,163 @@
+from typing import Any, Dict
+
+# Response schemas in the OpenAPI subset Gemini accepts for response_schema.
+# An object without "properties" stands for a free-form mapping (course name
+# to reason, for example); Gemini cannot express those, so schemas containing
+# one are only enforced locally.
+
+STRING = {"type": "string"}
+STRINGS = {"type": "array", "items": STRING}
+MAPPING = {"type": "object"}
+
+QUESTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": STRING,
+        "type": STRING,
+        "text": STRING,
+        "options": STRINGS,
+        "language": STRING,
+    },
+    "required": ["id", "type", "text", "options", "language"],
+}
+
+STREAMS_SCHEMA = {
+    "type": "object",
+    "properties": {"streams": STRINGS, "reasons": MAPPING, "message": STRING},
+    "required": ["streams", "reasons"],
+}
+
+CAREERS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "courses": STRINGS,
+        "careers": MAPPING,
+        "reasons": MAPPING,
+        "message": STRING,
+    },
+    "required": ["courses", "careers", "reasons"],
+}
+
+COLLEGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "top_colleges": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": STRING,
+                    "field": STRING,
+                    "location": STRING,
+                    "rank": STRING,
+                    "reason": STRING,
+                    "fit_score": {"type": "number"},
+                    "estimated_fees": STRING,
+                    "admission_requirements": STRING,
+                    "considerations": STRINGS,
+                },
+                "required": ["name", "field", "location", "reason"],
+            },
+        },
+        "budget_strategy": STRING,
+        "location_advice": STRING,
+        "admission_timeline": {
+            "type": "object",
+            "properties": {
+                "immediate": STRING,
+                "short_term": STRING,
+                "application_period": STRING,
+            },
+        },
+        "next_steps": STRINGS,
+    },
+    "required": ["top_colleges"],
+}
+
+TIMELINE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "immediate_actions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "action": STRING,
+                    "deadline": STRING,
+                    "priority": STRING,
+                    "reason": STRING,
+                },
+                "required": ["action"],
+            },
+        },
+        "monthly_plan": {
+            "type": "object",
+            "properties": {
+                "current_month": STRINGS,
+                "next_3_months": STRINGS,
+                "next_6_months": STRINGS,
+            },
+        },
+        "exam_calendar": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "exam_name": STRING,
+                    "registration_deadline": STRING,
+                    "exam_date": STRING,
+                    "relevance": STRING,
+                },
+                "required": ["exam_name"],
+            },
+        },
+        "critical_deadlines": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"event": STRING, "deadline": STRING, "impact": STRING},
+                "required": ["event"],
+            },
+        },
+        "progress_tracking": STRINGS,
+    },
+    "required": ["immediate_actions"],
+}
+
+TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+}
+
+
+def check(value: Any, schema: Dict[str, Any], path: str = "$") -> None:
+    expected = TYPES[schema["type"]]
+    if not isinstance(value, expected) or (
+        isinstance(value, bool) and schema["type"] != "boolean"
+    ):
+        raise ValueError(f"{path}: expected {schema['type']}")
+
+    if schema["type"] == "object":
+        for key in schema.get("required", []):
+            if key not in value:
+                raise ValueError(f"{path}: missing field: {key}")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                check(value[key], subschema, f"{path}.{key}")
+
+    elif schema["type"] == "array" and "items" in schema:
+        for index, item in enumerate(value):
+            check(item, schema["items"], f"{path}[{index}]")
+
+
+def is_strict(schema: Dict[str, Any]) -> bool:
+    if schema["type"] == "object":
+        properties = schema.get("properties")
+        return bool(properties) and all(is_strict(s) for s in properties.values())
+    if schema["type"] == "array":
+        return is_strict(schema.get("items", STRING))
+    return True
@@ -0,0 +1,27 @@
+import json
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Tuple
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events: AsyncIterator[Tuple[str, Any]]) -> StreamingResponse:
+    async def body() -> AsyncIterator[str]:
+        yield sse_event("start", {})
+
+        try:
+            async for event, data in events:
+                yield sse_event(event, data)
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+
+        yield sse_event("done", {})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,123 @@
+import os
+import asyncio
+from app.db import execute, get_supabase
+from postgrest import ReturnMethod
+from typing import Any, Dict, List, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "50"))
+WRITE_BATCH_DELAY = float(os.getenv("WRITE_BATCH_DELAY", "0.05"))
+WRITE_MAX_ATTEMPTS = int(os.getenv("WRITE_MAX_ATTEMPTS", "3"))
+WRITE_RETRY_BACKOFF = float(os.getenv("WRITE_RETRY_BACKOFF", "1"))
+
+Batches = Dict[Tuple[str, str], Dict[Tuple[Any, ...], Dict[str, Any]]]
+
+
+class WriteQueue:
+    """Write-behind upserts, batched per table and written by one task.
+
+    Records are keyed by their conflict columns, so a newer write for the
+    same row replaces an older one that has not been sent yet.
+    """
+
+    def __init__(self) -> None:
+        self.pending: Batches = {}
+        self.inflight: Batches = {}
+        self.wakeup = asyncio.Event()
+        self.stopping = False
+        self.task: asyncio.Task | None = None
+        self.written = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        self.stopping = False
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        self.stopping = True
+        self.wakeup.set()
+        if self.task is not None:
+            await self.task
+            self.task = None
+
+    def put(self, table: str, record: Dict[str, Any], on_conflict: str) -> None:
+        key = tuple(record[column] for column in on_conflict.split(","))
+        self.pending.setdefault((table, on_conflict), {})[key] = record
+        self.wakeup.set()
+
+    def discard(self, table: str, on_conflict: str, user_id: str) -> None:
+        records = self.pending.get((table, on_conflict), {})
+        for key in [
+            key for key, record in records.items() if record["user_id"] == user_id
+        ]:
+            del records[key]
+
+    def peek(
+        self, table: str, on_conflict: str, key: Tuple[Any, ...]
+    ) -> Dict[str, Any] | None:
+        for batches in (self.pending, self.inflight):
+            record = batches.get((table, on_conflict), {}).get(key)
+            if record is not None:
+                return record
+        return None
+
+    async def run(self) -> None:
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            if not self.stopping:
+                # let writes from the same burst share a batch
+                await asyncio.sleep(WRITE_BATCH_DELAY)
+
+            await self.flush()
+            if self.stopping and not self.pending:
+                return
+
+    async def flush(self) -> None:
+        self.inflight, self.pending = self.pending, {}
+        try:
+            for (table, on_conflict), records in self.inflight.items():
+                rows = list(records.values())
+                for start in range(0, len(rows), WRITE_BATCH_SIZE):
+                    await self.write(
+                        table, on_conflict, rows[start : start + WRITE_BATCH_SIZE]
+                    )
+        finally:
+            self.inflight = {}
+
+    async def write(
+        self, table: str, on_conflict: str, rows: List[Dict[str, Any]]
+    ) -> None:
+        supabase = get_supabase()
+
+        for attempt in range(1, WRITE_MAX_ATTEMPTS + 1):
+            try:
+                await execute(
+                    supabase.table(table).upsert(
+                        rows, on_conflict=on_conflict, returning=ReturnMethod.minimal
+                    )
+                )
+                self.written += len(rows)
+                return
+            except Exception as e:
+                if attempt == WRITE_MAX_ATTEMPTS:
+                    self.failed += len(rows)
+                    print(f"Error writing {len(rows)} rows to {table}: {e}")
+                    return
+                self.retried += 1
+                await asyncio.sleep(WRITE_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": sum(len(records) for records in self.pending.values()),
+            "inflight": sum(len(records) for records in self.inflight.values()),
+            "written": self.written,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+write_queue = WriteQueue()
@@ -0,0 +1,53 @@
+"""Micro-benchmark for the keyword classifiers.
+
+Run from the repository root: python -m scripts.bench_classify
+"""
+
+import timeit
+from app.classify import COURSE_FIELDS
+
+COURSES = [
+    "B.Tech Computer Science",
+    "B.Tech CSE",
+    "MBBS",
+    "B.Pharmacy",
+    "BBA",
+    "MBA in Finance",
+    "BA LLB",
+    "BA Fine Arts",
+    "B.Arch",
+    "Hotel Management",
+    "B.Sc Nursing",
+    "Diploma in Mechanical Engineering",
+    "Mass Communication and Journalism",
+    "B.Com (Hons)",
+    "Economics Honours",
+    "Biotechnology",
+]
+BATCH = [f"{course} {i}" for i in range(64) for course in COURSES]
+
+
+def cold(batch):
+    # a fresh cache each run so every input goes through the regex
+    COURSE_FIELDS.cache.clear()
+    return COURSE_FIELDS.classify_many(batch)
+
+
+def one_by_one(batch):
+    COURSE_FIELDS.cache.clear()
+    return [COURSE_FIELDS.classify(course) for course in batch]
+
+
+def report(name: str, func, number: int) -> None:
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(
+        f"{name:<28} {seconds * 1e6:10.1f} us/batch  {seconds * 1e9 / len(BATCH):8.0f} ns/item"
+    )
+
+
+if __name__ == "__main__":
+    print(f"{len(BATCH)} courses, {len(COURSE_FIELDS.keywords)} keywords")
+    report("batch, cold cache", lambda: cold(BATCH), 20)
+    report("one at a time, cold cache", lambda: one_by_one(BATCH), 20)
+    COURSE_FIELDS.classify_many(BATCH)
+    report("batch, warm cache", lambda: COURSE_FIELDS.classify_many(BATCH), 200)
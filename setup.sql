@@ -32,6 +32,12 @@ CREATE TABLE IF NOT EXISTS quiz_responses (
   created_at timestamptz DEFAULT now()
 );
 
+-- One row per answered question; rows written before this column existed
+-- keep a NULL question_number, which the unique index does not constrain
+ALTER TABLE quiz_responses ADD COLUMN IF NOT EXISTS question_number int;
+CREATE UNIQUE INDEX IF NOT EXISTS quiz_responses_quiz_id_question_number_key
+  ON quiz_responses (quiz_id, question_number);
+
 -- Create colleges table for storing college recommendations
 CREATE TABLE IF NOT EXISTS colleges (
   id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -42,6 +48,9 @@ CREATE TABLE IF NOT EXISTS colleges (
   updated_at timestamptz DEFAULT now()
 );
 
+-- One stored college recommendation per user
+CREATE UNIQUE INDEX IF NOT EXISTS colleges_user_id_key ON colleges (user_id);
+
 -- Create timelines table for storing timeline recommendations
 CREATE TABLE IF NOT EXISTS timelines (
   id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -51,3 +60,16 @@ CREATE TABLE IF NOT EXISTS timelines (
   created_at timestamptz DEFAULT now(),
   updated_at timestamptz DEFAULT now()
 );
+
+-- One stored timeline per user
+CREATE UNIQUE INDEX IF NOT EXISTS timelines_user_id_key ON timelines (user_id);
+
+-- Create recommendations table for caching generated recommendations
+CREATE TABLE IF NOT EXISTS recommendations (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id uuid REFERENCES profiles(user_id),
+  fingerprint text NOT NULL,
+  recommendations_json jsonb,
+  created_at timestamptz DEFAULT now(),
+  UNIQUE (user_id, fingerprint)
+);